@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Benchmark the scraper against the local stand-in server (standin_server.py), no network needed.
+
+Usage:
+  py benchmark.py                                   # all benchmarks, results in bench_results.json
+  py benchmark.py --only api_scrape resume --rows 50000 --latency 0.02
+  py benchmark.py --output after.json --compare before.json
+
+Benchmarks:
+  api_scrape  API paging into a CSV checkpoint (pages/s, rows/s, p50/p95 request latency)
+  resume      resume-offset search (find_resume_offset_via_api) for a record in the middle
+  csv_to_xlsx CSV checkpoint to XLSX conversion (rows/s)
+  selenium    the browser page-turn loop (pages/s, rows/s); skipped when Chrome is unavailable
+  startup     time to import run.py and to start `cli.py scrape-api`, the heavy modules an
+              HTTP-only run loads, and whether the import fits cli.STARTUP_BUDGET_MS
+
+Each benchmark runs in its own subprocess so its peak RSS can be reported (resource module;
+null on Windows). Results are written as JSON with the git commit and parameters, and
+--compare prints the change of every metric against an earlier results file.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS = ("api_scrape", "resume", "csv_to_xlsx", "selenium", "startup")
+# Metrics compared by --compare; only throughput is better larger
+METRICS = ("seconds", "pages_per_s", "rows_per_s", "p50_ms", "p95_ms", "peak_rss_mb", "import_ms", "cli_help_ms")
+# Modules an HTTP-only run should never load
+HEAVY_MODULES = ("selenium", "webdriver_manager", "openpyxl", "pyarrow")
+HIGHER_IS_BETTER = ("pages_per_s", "rows_per_s")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def timed_session(latencies, workers=1):
+    """HTTP session (as used by run.py) that records every response's elapsed time."""
+    from run import make_http_session
+    session = make_http_session(headers={'User-Agent': 'Mozilla/5.0'}, pool_size=max(10, workers))
+    session.hooks['response'].append(lambda r, *a, **k: latencies.append(r.elapsed.total_seconds()))
+    return session
+
+
+def latency_metrics(latencies):
+    p50, p95 = percentile(latencies, 50), percentile(latencies, 95)
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+        'p95_ms': round(p95 * 1000, 2) if p95 is not None else None,
+    }
+
+
+def count_csv_rows(path):
+    import csv
+    if not os.path.exists(path):
+        return 0
+    with open(path, newline='', encoding='utf-8') as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def bench_api_scrape(base_url, workdir, params):
+    from run import api_scrape, API_ORDER_PARAMS, DISPLAY_PAGE_LENGTH
+    latencies = []
+    session = timed_session(latencies, params['workers'])
+    csv_path = os.path.join(workdir, "bench_api.csv")
+    end_page = -(-params['rows'] // DISPLAY_PAGE_LENGTH)
+    t0 = time.perf_counter()
+    rows = api_scrape(base_url + "api", 1, end_page, csv_path, page_length=params['page_length'],
+                      workers=params['workers'], session=session, extra_params=API_ORDER_PARAMS)
+    elapsed = time.perf_counter() - t0
+    result = {'seconds': round(elapsed, 3), 'rows': rows,
+              'pages_per_s': round(len(latencies) / elapsed, 2), 'rows_per_s': round(rows / elapsed, 1)}
+    result.update(latency_metrics(latencies))
+    return result
+
+
+def bench_resume(base_url, workdir, params):
+    from run import find_resume_offset_via_api, fetch_api_page, API_ORDER_PARAMS, REG_NO_INDEX
+    latencies = []
+    session = timed_session(latencies)
+    ajax_url = base_url + "api"
+    middle = params['rows'] // 2
+    target = fetch_api_page(session, ajax_url, middle, 1, extra_params=API_ORDER_PARAMS)[0][REG_NO_INDEX]
+    del latencies[:]
+    t0 = time.perf_counter()
+    offset, exact = find_resume_offset_via_api(target, ajax_url, session)
+    elapsed = time.perf_counter() - t0
+    result = {'seconds': round(elapsed, 3), 'offset': offset, 'correct': offset == middle + 1 and exact}
+    result.update(latency_metrics(latencies))
+    return result
+
+
+def bench_csv_to_xlsx(base_url, workdir, params):
+    from csv_to_xlsx import csv_to_xlsx
+    from standin_server import COLUMNS, synthetic_rows
+    import csv
+    csv_path = os.path.join(workdir, "bench_convert.csv")
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(synthetic_rows(params['rows']))
+    t0 = time.perf_counter()
+    csv_to_xlsx(csv_path, os.path.join(workdir, "bench_convert.xlsx"), 'utf-8', progress_every=0)
+    elapsed = time.perf_counter() - t0
+    return {'seconds': round(elapsed, 3), 'rows': params['rows'], 'rows_per_s': round(params['rows'] / elapsed, 1)}
+
+
+def chrome_available():
+    from run import local_chrome_version
+    names = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+    return any(shutil.which(n) for n in names) or bool(local_chrome_version())
+
+
+def bench_selenium(base_url, workdir, params):
+    if not chrome_available():
+        return {'skipped': "Chrome is not installed"}
+    from run import scrape_greenbook
+    csv_path = os.path.join(workdir, "bench_browser.csv")
+    t0 = time.perf_counter()
+    scrape_greenbook(output_file=os.path.join(workdir, "bench_browser.xlsx"), end_page=params['browser_pages'],
+                     resume=False, start_page=1, browser_only=True, csv_only=True, fast_nav=True,
+                     skip_log=os.path.join(workdir, "skipped_pages.log"),
+                     rate_control=False, cache_dir=None, base_url=base_url)
+    elapsed = time.perf_counter() - t0
+    rows = count_csv_rows(csv_path)
+    return {'seconds': round(elapsed, 3), 'rows': rows, 'pages_per_s': round(params['browser_pages'] / elapsed, 2),
+            'rows_per_s': round(rows / elapsed, 1)}
+
+
+def bench_startup(base_url, workdir, params):
+    here = os.path.dirname(os.path.abspath(__file__))
+    probe = ("import sys, time, json; sys.path.insert(0, %r); t = time.perf_counter(); import run, cli; "
+             "ms = (time.perf_counter() - t) * 1000; "
+             "print(json.dumps([ms, cli.STARTUP_BUDGET_MS, [m for m in %r if m in sys.modules]]))") % (here, HEAVY_MODULES)
+    # Best of a few runs, so a cold disk cache does not dominate
+    import_ms, budget, heavy = min(json.loads(subprocess.run([sys.executable, "-c", probe], capture_output=True,
+                                                             text=True).stdout) for _ in range(5))
+    help_times = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(here, "cli.py"), "scrape-api", "--help"], capture_output=True)
+        help_times.append(time.perf_counter() - t0)
+    return {'import_ms': round(import_ms, 1), 'cli_help_ms': round(min(help_times) * 1000, 1),
+            'budget_ms': budget, 'within_budget': import_ms <= budget, 'heavy_modules': heavy}
+
+
+def run_child(name, base_url, params):
+    """Entry point of the per-benchmark subprocess; prints one JSON line."""
+    workdir = tempfile.mkdtemp(prefix=f"greenbook_bench_{name}_")
+    cwd = os.getcwd()
+    try:
+        # run.py writes logs relative to the working directory; keep them in the scratch dir
+        os.chdir(workdir)
+        result = globals()[f"bench_{name}"](base_url, workdir, params)
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    result['peak_rss_mb'] = peak_rss_mb()
+    print("BENCH_RESULT " + json.dumps(result))
+
+
+def run_benchmark(name, base_url, params):
+    here = os.path.dirname(os.path.abspath(__file__))
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", name, "--child-url", base_url,
+           "--child-params", json.dumps(params)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=here)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    return {'error': (proc.stderr.strip().splitlines() or ["no result"])[-1]}
+
+
+def compare(results, baseline_path):
+    """Print the % change of each numeric metric against an earlier results file."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    for name, metrics in results['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name, {})
+        for key in METRICS:
+            value, old = metrics.get(key), before.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            better = change > 0 if key in HIGHER_IS_BETTER else change < 0
+            flag = "" if abs(change) < 5 else (" better" if better else " WORSE")
+            print(f"  {name}.{key}: {old} -> {value} ({change:+.1f}%){flag}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the Greenbook scraper against a local stand-in server")
+    p.add_argument("--only", nargs='+', choices=BENCHMARKS, help="Benchmarks to run (default: all)")
+    p.add_argument("--rows", type=int, default=20000, help="Records served by the stand-in")
+    p.add_argument("--fixture", help="Serve the rows of this CSV checkpoint instead of synthetic data")
+    p.add_argument("--latency", type=float, default=0.01, help="Stand-in latency per API request (seconds)")
+    p.add_argument("--jitter", type=float, default=0.005, help="Random +/- latency (seconds)")
+    p.add_argument("--max-length", type=int, default=1000, help="Largest page length the stand-in honours")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests failing with HTTP 500")
+    p.add_argument("--page-length", type=int, default=500, help="Records per API request in api_scrape")
+    p.add_argument("--workers", type=int, default=4, help="Concurrent API requests in api_scrape")
+    p.add_argument("--browser-pages", type=int, default=20, help="Pages turned in the selenium benchmark")
+    p.add_argument("--output", "-o", default="bench_results.json", help="Where to write the JSON results")
+    p.add_argument("--compare", help="Earlier results file to compare against")
+    p.add_argument("--child", help=argparse.SUPPRESS)
+    p.add_argument("--child-url", help=argparse.SUPPRESS)
+    p.add_argument("--child-params", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.child:
+        run_child(args.child, args.child_url, json.loads(args.child_params))
+        return
+
+    from standin_server import StandinState, start_server, synthetic_rows, fixture_rows
+    rows = fixture_rows(args.fixture) if args.fixture else synthetic_rows(args.rows)
+    state = StandinState(rows, latency=args.latency, jitter=args.jitter, max_length=args.max_length,
+                         error_rate=args.error_rate)
+    server, base_url = start_server(state)
+    params = {'rows': len(rows), 'latency': args.latency, 'jitter': args.jitter, 'max_length': args.max_length,
+              'error_rate': args.error_rate, 'page_length': args.page_length, 'workers': args.workers,
+              'browser_pages': args.browser_pages, 'fixture': args.fixture}
+    print(f"Stand-in serving {len(rows)} records at {base_url}")
+
+    results = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+               'python': sys.version.split()[0], 'params': params, 'benchmarks': {}}
+    try:
+        for name in args.only or BENCHMARKS:
+            print(f"Running {name}...")
+            result = run_benchmark(name, base_url, params)
+            results['benchmarks'][name] = result
+            print(f"  {name}: {json.dumps(result)}")
+    finally:
+        server.shutdown()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {args.output}")
+    if args.compare:
+        try:
+            compare(results, args.compare)
+        except Exception as e:
+            print(f"Could not compare with {args.compare}: {e}")
+
+
+if __name__ == '__main__':
+    main()
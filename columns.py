@@ -0,0 +1,14 @@
+"""Column layout of the Greenbook table, shared by the scraper, stores and converters.
+
+Rows are kept as lists of cells in the order the site returns them, so every module that
+indexes into a row takes its positions from here.
+"""
+
+# Columns of the Greenbook table, in the order the site returns them (10 cells per row)
+GREENBOOK_COLUMNS = [
+    "Product Name", "Active Ingredient", "Product Category",
+    "NAFDAC Reg No", "Dosage Form", "Route of Administration",
+    "Strength", "Applicant", "Approval Date", "Status"
+]
+REG_NO_INDEX = 3
+APPROVAL_DATE_INDEX = 8
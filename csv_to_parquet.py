@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Small utility: stream a CSV checkpoint into Parquet (or Arrow IPC) for analytics.
+
+Usage:
+  py csv_to_parquet.py --input nafdac_greenbook.csv --output nafdac_greenbook.parquet
+  py csv_to_parquet.py -i nafdac_greenbook.csv -o greenbook_by_year --partition-by year
+
+The CSV is read once in batches. Low-cardinality text columns are dictionary-encoded (one
+dictionary per column, extended from batch to batch) and Approval Date is stored as a date. With --partition-by the output is a directory of
+hive-style partitions ("Product Category=.../" or "approval_year=.../") so queries only read what they need.
+"""
+import csv
+import argparse
+import os
+import sys
+from datetime import date
+
+from columns import GREENBOOK_COLUMNS
+
+# Repeated values that compress far better as dictionaries
+DICTIONARY_COLUMNS = {"Product Category", "Dosage Form", "Route of Administration", "Strength", "Applicant", "Status"}
+DATE_COLUMN = "Approval Date"
+PARTITION_COLUMNS = {"category": "Product Category", "year": "approval_year"}
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value.strip()[:10])
+    except Exception:
+        return None
+
+
+def build_schema(pa, columns, partition_by=None):
+    fields = []
+    for name in columns:
+        if name == DATE_COLUMN:
+            fields.append(pa.field(name, pa.date32()))
+        elif name in DICTIONARY_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    if partition_by == "year":
+        fields.append(pa.field("approval_year", pa.int32()))
+    return pa.schema(fields)
+
+
+def to_batch(pa, cols, schema, dictionaries):
+    """Build a RecordBatch from column lists, dictionary-encoding where the schema asks for it.
+    `dictionaries` (value -> index per column) is shared by all batches and only ever grows, so
+    each batch's dictionary extends the previous one: Arrow IPC files accept that as a delta
+    but reject a replaced dictionary.
+    """
+    arrays = []
+    for field in schema:
+        values = cols[field.name]
+        if pa.types.is_dictionary(field.type):
+            index = dictionaries.setdefault(field.name, {})
+            codes = [None if v is None else index.setdefault(v, len(index)) for v in values]
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(list(index), pa.string())))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_batches(pa, csv_path, schema, columns, batch_size, encoding='utf-8'):
+    """Yield RecordBatches of `batch_size` rows read from the CSV (header row skipped)."""
+    names = schema.names
+    dictionaries = {}
+    with open(csv_path, newline='', encoding=encoding) as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        cols = {n: [] for n in names}
+        count = 0
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            for i, name in enumerate(columns):
+                value = row[i] if i < len(row) else None
+                if name == DATE_COLUMN:
+                    value = parse_date(value) if value else None
+                cols[name].append(value)
+            if "approval_year" in cols:
+                d = cols[DATE_COLUMN][-1]
+                cols["approval_year"].append(d.year if d else None)
+            count += 1
+            if count >= batch_size:
+                yield to_batch(pa, cols, schema, dictionaries)
+                cols = {n: [] for n in names}
+                count = 0
+        if count:
+            yield to_batch(pa, cols, schema, dictionaries)
+
+
+def csv_to_parquet(csv_path, out_path, fmt='parquet', partition_by=None, batch_size=50000, compression='zstd', encoding='utf-8'):
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    if partition_by and partition_by not in PARTITION_COLUMNS:
+        raise ValueError(f"--partition-by must be one of: {', '.join(PARTITION_COLUMNS)}")
+
+    # Import pyarrow at runtime so the scraper does not depend on it
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.dataset as ds
+    except Exception:
+        raise RuntimeError("pyarrow is not installed. Install it with: pip install pyarrow")
+
+    # Checkpoints written before the 10-column header carry 8 header names over 10-cell rows,
+    # so the column layout is taken from GREENBOOK_COLUMNS rather than the header row.
+    columns = GREENBOOK_COLUMNS
+    schema = build_schema(pa, columns, partition_by)
+    batches = iter_batches(pa, csv_path, schema, columns, batch_size, encoding=encoding)
+
+    rows = 0
+    if partition_by:
+        part_col = PARTITION_COLUMNS[partition_by]
+        part_schema = pa.schema([pa.field(part_col, pa.string() if partition_by == "category" else pa.int32())])
+
+        def counted():
+            nonlocal rows
+            for b in batches:
+                if partition_by == "category":
+                    # Partition keys must be plain values, not dictionary indices
+                    idx = b.schema.get_field_index(part_col)
+                    b = b.set_column(idx, part_col, b.column(idx).cast(pa.string()))
+                rows += b.num_rows
+                yield b
+
+        write_schema = schema.set(schema.get_field_index(part_col), pa.field(part_col, part_schema.field(0).type))
+        file_format = ds.ParquetFileFormat() if fmt == 'parquet' else ds.IpcFileFormat()
+        if fmt == 'parquet':
+            options = file_format.make_write_options(compression=compression)
+        else:
+            options = file_format.make_write_options(emit_dictionary_deltas=True)
+        print(f"Writing {fmt} dataset partitioned by {part_col}: {out_path}")
+        ds.write_dataset(counted(), out_path, schema=write_schema, format=file_format, file_options=options,
+                         partitioning=ds.partitioning(part_schema, flavor="hive"),
+                         existing_data_behavior="delete_matching")
+    elif fmt == 'parquet':
+        print(f"Writing Parquet: {out_path}")
+        with pq.ParquetWriter(out_path, schema, compression=compression, use_dictionary=True) as writer:
+            for b in batches:
+                writer.write_batch(b)
+                rows += b.num_rows
+    else:
+        print(f"Writing Arrow IPC: {out_path}")
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        with pa.OSFile(out_path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+            for b in batches:
+                writer.write_batch(b)
+                rows += b.num_rows
+
+    print(f"Saved {rows} rows to {out_path}")
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser(description="Convert CSV checkpoint to Parquet / Arrow IPC (streaming)")
+    p.add_argument("--input", "-i", default="nafdac_greenbook.csv", help="Input CSV file")
+    p.add_argument("--output", "-o", default="nafdac_greenbook.parquet", help="Output file (or directory with --partition-by)")
+    p.add_argument("--format", "-f", choices=["parquet", "arrow"], default="parquet", help="Output format")
+    p.add_argument("--partition-by", choices=sorted(PARTITION_COLUMNS), help="Write a hive-partitioned dataset by category or approval year")
+    p.add_argument("--batch-size", type=int, default=50000, help="Rows per record batch")
+    args = p.parse_args()
+
+    try:
+        csv_to_parquet(args.input, args.output, fmt=args.format, partition_by=args.partition_by, batch_size=args.batch_size)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,38 +4,56 @@
 Usage:
   py csv_to_xlsx.py --input nafdac_greenbook.csv --output nafdac_greenbook.xlsx
 
-This reads the CSV twice: first pass to compute reasonable column widths, second pass to write rows.
+The CSV is read once. Column widths are estimated from the first rows (a bounded sample)
+and set before any row is written, which is the only point where write-only worksheets
+accept them. Past Excel's row limit the output rolls over to a new worksheet.
 """
 import csv
 import argparse
 import os
-Workbook = None
+import time
 
+# Excel's hard limit per worksheet (header row included)
+EXCEL_MAX_ROWS = 1048576
+# Rows buffered to estimate column widths before streaming starts
+WIDTH_SAMPLE_ROWS = 1000
+SHEET_TITLE = "NAFDAC Greenbook"
 
 
-def compute_max_widths(csv_path, encoding='utf-8'):
+def compute_max_widths(rows):
+    """Return the longest cell length per column over `rows` (a sample, not the whole file)."""
     max_widths = []
-    with open(csv_path, newline='', encoding=encoding) as f:
-        reader = csv.reader(f)
-        for row in reader:
-            for i, cell in enumerate(row):
-                l = len(str(cell)) if cell is not None else 0
-                if i >= len(max_widths):
-                    max_widths.append(l)
-                else:
-                    if l > max_widths[i]:
-                        max_widths[i] = l
+    for row in rows:
+        for i, cell in enumerate(row):
+            l = len(str(cell)) if cell is not None else 0
+            if i >= len(max_widths):
+                max_widths.append(l)
+            elif l > max_widths[i]:
+                max_widths[i] = l
     return max_widths
 
 
-
-def csv_to_xlsx(csv_path, xlsx_path, encoding='utf-8'):
+def new_sheet(wb, index, widths, header):
+    """Create worksheet number `index` with column widths set and the header written."""
+    from openpyxl.utils import get_column_letter
+    title = SHEET_TITLE if index == 1 else f"{SHEET_TITLE} {index}"
+    ws = wb.create_sheet(title=title)
+    # Write-only sheets only honour column widths set before the first append
+    for i, w in enumerate(widths, start=1):
+        # add padding, cap width
+        ws.column_dimensions[get_column_letter(i)].width = min(max(10, int(w * 1.1) + 2), 60)
+    if header:
+        ws.append(header)
+    return ws
+
+
+def csv_to_xlsx(csv_path, xlsx_path, encoding='utf-8', progress_every=100000, max_rows=EXCEL_MAX_ROWS, save=None):
+    """Stream `csv_path` into a new workbook at `xlsx_path` and return the number of data rows.
+    save(wb, path), if given, does the final save and returns the path actually written.
+    """
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
-    print(f"Computing column widths for {csv_path}...")
-    widths = compute_max_widths(csv_path, encoding=encoding)
-
     # Import openpyxl at runtime to avoid module-level import issues across different python launches
     try:
         from openpyxl import Workbook
@@ -44,44 +62,58 @@ def csv_to_xlsx(csv_path, xlsx_path, encoding='utf-8'):
 
     print(f"Writing to Excel: {xlsx_path} (this may take a moment)...")
     wb = Workbook(write_only=True)
-    ws = wb.create_sheet(title="NAFDAC Greenbook")
+    started = time.time()
+    written = 0
 
     with open(csv_path, newline='', encoding=encoding) as f:
         reader = csv.reader(f)
+        header = next(reader, None)
+        # Buffer a bounded sample so widths are known before the first sheet is started
+        sample = []
         for row in reader:
-            # Convert None to empty strings
-            out = [c if c is not None else '' for c in row]
-            ws.append(out)
-
-    # Try to set column widths (openpyxl write-only supports column_dimensions assignment)
-    try:
-        for i, w in enumerate(widths, start=1):
-            col_letter = None
-            try:
-                from openpyxl.utils import get_column_letter
-                col_letter = get_column_letter(i)
-                # add padding, cap width
-                adj = min(max(10, int(w * 1.1) + 2), 60)
-                ws.parent.active = ws  # ensure active
-                ws.parent.column_dimensions[col_letter].width = adj
-            except Exception:
-                # ignore width set failures in write-only mode
-                pass
-    except Exception:
-        pass
-
-    wb.save(xlsx_path)
-    print(f"Saved Excel file: {xlsx_path}")
+            sample.append(row)
+            if len(sample) >= WIDTH_SAMPLE_ROWS:
+                break
+        widths = compute_max_widths(([header] if header else []) + sample)
+
+        sheets = 1
+        ws = new_sheet(wb, sheets, widths, header)
+        sheet_rows = 1 if header else 0
+
+        def rows():
+            yield from sample
+            yield from reader
+
+        for row in rows():
+            if sheet_rows >= max_rows:
+                sheets += 1
+                print(f"Sheet full at {written} rows, continuing on sheet {sheets}")
+                ws = new_sheet(wb, sheets, widths, header)
+                sheet_rows = 1 if header else 0
+            ws.append(row)
+            sheet_rows += 1
+            written += 1
+            if progress_every and written % progress_every == 0:
+                elapsed = time.time() - started
+                print(f"  {written} rows written ({written / elapsed:.0f} rows/s)" if elapsed else f"  {written} rows written")
+
+    if save:
+        xlsx_path = save(wb, xlsx_path)
+    else:
+        wb.save(xlsx_path)
+    print(f"Saved Excel file: {xlsx_path} ({written} rows, {sheets} sheet(s), {time.time() - started:.1f}s)")
+    return written
 
 
 def main():
     p = argparse.ArgumentParser(description="Convert CSV checkpoint to XLSX (streaming)")
     p.add_argument("--input", "-i", default="nafdac_greenbook.csv", help="Input CSV file")
     p.add_argument("--output", "-o", default="nafdac_greenbook.xlsx", help="Output XLSX file")
+    p.add_argument("--progress-every", type=int, default=100000, help="Print progress every N rows (0 to disable)")
     args = p.parse_args()
 
     try:
-        csv_to_xlsx(args.input, args.output)
+        csv_to_xlsx(args.input, args.output, progress_every=args.progress_every)
     except Exception as e:
         print(f"Error: {e}")
 
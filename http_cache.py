@@ -0,0 +1,143 @@
+"""On-disk cache of DataTables page responses.
+
+Responses are stored in a single SQLite file under the cache directory, keyed by a hash of
+the endpoint, HTTP method and request parameters (start, length, ordering, search, ...).
+The per-request `draw` counter and jQuery's `_` cache-buster are left out of the key.
+Entries are fresh for `ttl` seconds; stale entries are revalidated with If-None-Match /
+If-Modified-Since when the server sent an ETag / Last-Modified. The cache is trimmed to
+`max_bytes` by evicting the least recently used entries.
+
+Usage (from run.py):
+  py run.py --force-api                 # cache in .http_cache/, 24h TTL
+  py run.py --offline                   # rebuild the CSV/XLSX from cached pages only
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Parameters that change on every request without changing the response data
+VOLATILE_PARAMS = ('draw', '_')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    method TEXT NOT NULL,
+    params TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at);
+"""
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a request has no cached response."""
+
+
+def request_key(url, params, method='GET'):
+    """Content address of a request: hash of method, URL and the non-volatile parameters."""
+    stable = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in VOLATILE_PARAMS)
+    raw = json.dumps([str(method).upper(), url, stable], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe response cache with TTL, conditional revalidation and LRU size limit."""
+
+    def __init__(self, directory=".http_cache", ttl=86400, max_bytes=500 * 1024 * 1024, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = self.misses = self.revalidated = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "responses.sqlite3"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def lookup(self, url, params, method='GET'):
+        """Return (key, entry) where entry is a dict (body, etag, last_modified, fresh) or None."""
+        key = request_key(url, params, method)
+        with self._lock:
+            row = self.conn.execute("SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is None:
+                return key, None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        body, etag, last_modified, fetched_at = row
+        fresh = self.ttl is not None and time.time() - fetched_at < self.ttl
+        return key, {'body': body, 'etag': etag, 'last_modified': last_modified, 'fresh': fresh}
+
+    def conditional_headers(self, entry):
+        """Headers for revalidating a stale entry."""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, key, url, params, method, body, etag=None, last_modified=None):
+        now = time.time()
+        stable = {k: v for k, v in (params or {}).items() if k not in VOLATILE_PARAMS}
+        with self._lock:
+            self.conn.execute("INSERT INTO responses(key, url, method, params, body, etag, last_modified, fetched_at, accessed_at, size) "
+                              "VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                              "body = excluded.body, etag = excluded.etag, last_modified = excluded.last_modified, "
+                              "fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at, size = excluded.size",
+                              (key, url, str(method).upper(), json.dumps(stable, sort_keys=True), body,
+                               etag, last_modified, now, now, len(body)))
+            self._evict()
+            self.conn.commit()
+
+    def refresh(self, key):
+        """Mark an entry fresh again after a 304 Not Modified."""
+        with self._lock:
+            now = time.time()
+            self.conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def entries(self, url=None):
+        """Yield (url, method, params dict, body) for every cached response (optionally for one URL)."""
+        with self._lock:
+            if url:
+                rows = self.conn.execute("SELECT url, method, params, body FROM responses WHERE url = ?", (url,)).fetchall()
+            else:
+                rows = self.conn.execute("SELECT url, method, params, body FROM responses").fetchall()
+        for u, m, p, body in rows:
+            yield u, m, json.loads(p), body
+
+    def endpoints(self):
+        """Cached endpoint URLs, most recently used first."""
+        with self._lock:
+            return [r[0] for r in self.conn.execute("SELECT url FROM responses GROUP BY url ORDER BY MAX(accessed_at) DESC")]
+
+    def describe(self):
+        return f"cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} fetched"
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
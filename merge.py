@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Merge Greenbook checkpoints into one de-duplicated file, keyed on NAFDAC Reg No.
+
+Usage:
+  py merge.py nafdac_greenbook.xlsx nafdac_greenbook-data.xlsx -o nafdac_greenbook-data_merged.xlsx
+  py merge.py old.csv new.csv nafdac_greenbook.sqlite3 -o merged.csv --policy newest
+
+Inputs can be CSV checkpoints, XLSX exports or SQLite stores, in any number. They are
+streamed through an external sort: each input is read in chunks that are sorted by Reg No
+and spilled to temporary run files, then all runs are merged in one pass, so memory stays
+bounded by --chunk-size whatever the input sizes. When several rows share a Reg No one is
+kept according to --policy:
+  newest    latest Approval Date wins (ties go to the earlier input)
+  priority  the earliest input listed wins
+  last      the last input listed wins
+The report counts records added to, and replaced in, the first input, and rows dropped as
+duplicates. Output is sorted by Reg No.
+"""
+import csv
+import argparse
+import heapq
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from columns import GREENBOOK_COLUMNS, APPROVAL_DATE_INDEX
+from sqlite_store import record_key
+
+POLICIES = ("newest", "priority", "last")
+
+
+def iter_source(path, encoding='utf-8'):
+    """Yield the data rows (lists of str) of a CSV, XLSX or SQLite checkpoint."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        try:
+            from openpyxl import load_workbook
+        except Exception:
+            raise RuntimeError("openpyxl is not installed. Install it with: pip install openpyxl")
+        wb = load_workbook(path, read_only=True)
+        try:
+            for ws in wb.worksheets:
+                for row in ws.iter_rows(min_row=2, values_only=True):
+                    cells = ['' if c is None else str(c) for c in row]
+                    while cells and cells[-1] == '':
+                        cells.pop()
+                    if cells:
+                        yield cells
+        finally:
+            wb.close()
+    elif ext in ('.sqlite3', '.sqlite', '.db'):
+        from sqlite_store import SQLiteStore
+        store = SQLiteStore(path)
+        try:
+            for row in store.iter_rows():
+                yield ['' if c is None else str(c) for c in row]
+        finally:
+            store.close()
+    else:
+        with open(path, newline='', encoding=encoding) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if any(cell.strip() for cell in row):
+                    yield row
+
+
+def spill_runs(paths, tmpdir, chunk_size=100000):
+    """Sort each input in chunks of `chunk_size` rows and write them as run files.
+    Run rows are [key, source index, sequence, *cells]. Returns the run file paths.
+    """
+    runs = []
+
+    def spill(chunk):
+        chunk.sort(key=lambda r: (r[0], r[1], r[2]))
+        run = os.path.join(tmpdir, f"run{len(runs):05d}.csv")
+        with open(run, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for r in chunk:
+                writer.writerow([r[0], r[1], r[2]] + r[3])
+        runs.append(run)
+
+    for src, path in enumerate(paths):
+        chunk = []
+        count = 0
+        for seq, row in enumerate(iter_source(path)):
+            chunk.append((record_key(row), src, seq, row))
+            count += 1
+            if len(chunk) >= chunk_size:
+                spill(chunk)
+                chunk = []
+        if chunk:
+            spill(chunk)
+        print(f"Read {count} rows from {path}")
+    return runs
+
+
+def read_run(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for r in csv.reader(f):
+            yield r[0], int(r[1]), int(r[2]), r[3:]
+
+
+def approval_date(row):
+    try:
+        return date.fromisoformat(row[APPROVAL_DATE_INDEX].strip()[:10])
+    except Exception:
+        return date.min
+
+
+def same_cells(row):
+    """Row cells stripped of surrounding and trailing blanks, for comparing rows across formats."""
+    cells = [str(c).strip() for c in row]
+    while cells and not cells[-1]:
+        cells.pop()
+    return cells
+
+
+def choose(group, policy):
+    """Return the (key, source, seq, row) entry that wins among rows sharing a key."""
+    if policy == "priority":
+        return min(group, key=lambda e: (e[1], -e[2]))
+    if policy == "last":
+        return max(group, key=lambda e: (e[1], e[2]))
+    # newest: latest approval date, then earlier input, then later row within it
+    return max(group, key=lambda e: (approval_date(e[3]), -e[1], e[2]))
+
+
+class OutputWriter:
+    """Single-pass writer for the merged rows: CSV, or a write-only XLSX with sheet rollover."""
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.xlsx = os.path.splitext(path)[1].lower() == '.xlsx'
+        if self.xlsx:
+            try:
+                from openpyxl import Workbook
+            except Exception:
+                raise RuntimeError("openpyxl is not installed. Install it with: pip install openpyxl")
+            from csv_to_xlsx import new_sheet, EXCEL_MAX_ROWS
+            self._new_sheet = new_sheet
+            self.max_rows = EXCEL_MAX_ROWS
+            self.wb = Workbook(write_only=True)
+            self.widths = [max(len(h), 18) for h in header]
+            self.sheets = 1
+            self.ws = new_sheet(self.wb, self.sheets, self.widths, header)
+            self.sheet_rows = 1
+        else:
+            self.tmp = path + ".tmp"
+            self.f = open(self.tmp, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.f)
+            self.writer.writerow(header)
+
+    def write(self, row):
+        if not self.xlsx:
+            self.writer.writerow(row)
+            return
+        if self.sheet_rows >= self.max_rows:
+            self.sheets += 1
+            self.ws = self._new_sheet(self.wb, self.sheets, self.widths, self.header)
+            self.sheet_rows = 1
+        self.ws.append(row)
+        self.sheet_rows += 1
+
+    def close(self):
+        if self.xlsx:
+            self.wb.save(self.path)
+        else:
+            self.f.close()
+            os.replace(self.tmp, self.path)
+
+
+def merge_checkpoints(paths, out_path, policy="newest", chunk_size=100000):
+    """Merge `paths` into `out_path` keyed on Reg No. Returns a dict of counts
+    (written, added, replaced, dropped) where added/replaced are relative to paths[0].
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"--policy must be one of: {', '.join(POLICIES)}")
+    for p in paths:
+        if not os.path.exists(p):
+            raise FileNotFoundError(f"Input not found: {p}")
+
+    stats = {'written': 0, 'added': 0, 'replaced': 0, 'dropped': 0}
+    tmpdir = tempfile.mkdtemp(prefix="greenbook_merge_", dir=os.path.dirname(os.path.abspath(out_path)))
+    try:
+        runs = spill_runs(paths, tmpdir, chunk_size=chunk_size)
+        print(f"Merging {len(runs)} sorted run(s) with policy '{policy}'...")
+        out = OutputWriter(out_path, GREENBOOK_COLUMNS)
+        group = []
+
+        def flush():
+            winner = choose(group, policy)
+            base = [e for e in group if e[1] == 0]
+            if not base:
+                stats['added'] += 1
+            elif winner[1] != 0 and same_cells(winner[3]) != same_cells(base[-1][3]):
+                stats['replaced'] += 1
+            stats['dropped'] += len(group) - 1
+            out.write(winner[3])
+            stats['written'] += 1
+
+        for entry in heapq.merge(*(read_run(r) for r in runs), key=lambda e: (e[0], e[1], e[2])):
+            if group and entry[0] != group[0][0]:
+                flush()
+                group = []
+            group.append(entry)
+        if group:
+            flush()
+        out.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print(f"Saved {stats['written']} records to {out_path}: {stats['added']} added, "
+          f"{stats['replaced']} replaced, {stats['dropped']} duplicate rows dropped")
+    return stats
+
+
+def main():
+    p = argparse.ArgumentParser(description="Merge CSV/XLSX/SQLite checkpoints keyed on NAFDAC Reg No (streaming)")
+    p.add_argument("inputs", nargs='+', help="Input checkpoints; the first is the base the report is relative to")
+    p.add_argument("--output", "-o", default="nafdac_greenbook-data_merged.xlsx", help="Output file (.csv or .xlsx)")
+    p.add_argument("--policy", choices=POLICIES, default="newest", help="Which row wins when a Reg No appears more than once")
+    p.add_argument("--chunk-size", type=int, default=100000, help="Rows sorted in memory at a time")
+    args = p.parse_args()
+
+    try:
+        merge_checkpoints(args.inputs, args.output, policy=args.policy, chunk_size=args.chunk_size)
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""Run metrics for the scraper: counters, gauges and latency histograms per phase.
+
+run.py times each phase (driver init, page navigation, row extraction, API fetch, checkpoint
+write, Excel save, resume detection) into the process-wide METRICS registry. A
+MetricsReporter periodically prints a rows/s and ETA line, writes a JSON snapshot and can
+serve the Prometheus text format on a local port. log() is a leveled print: per-page lines
+are logged at 'debug' and hidden at the default 'info' level.
+
+Usage (from run.py):
+  py run.py --metrics-file metrics.json --metrics-port 9108
+  py run.py --log-level debug           # per-page lines as before
+  curl http://127.0.0.1:9108/metrics
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LOG_LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+# Read from the environment so shard processes follow the parent's --log-level
+_log_level = LOG_LEVELS.get(os.environ.get('GREENBOOK_LOG_LEVEL', 'info'), LOG_LEVELS['info'])
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def set_log_level(name):
+    global _log_level
+    _log_level = LOG_LEVELS[name]
+    os.environ['GREENBOOK_LOG_LEVEL'] = name
+
+
+def log(message, level='info'):
+    """print() `message` if `level` is at or above the configured log level."""
+    if LOG_LEVELS[level] >= _log_level:
+        print(message)
+
+
+class Histogram:
+    """Cumulative bucket counts (for Prometheus) plus a window of recent samples (for percentiles)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1000):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, pct):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms, keyed by name and labels."""
+
+    def __init__(self, prefix="greenbook"):
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of the `with` block in histogram `name` (even if it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def value(self, name, **labels):
+        """Current value of a counter or gauge (summed over labels if none are given)."""
+        with self._lock:
+            if labels:
+                key = (name, tuple(sorted(labels.items())))
+                return self.counters.get(key, self.gauges.get(key, 0))
+            total = sum(v for (n, _), v in self.counters.items() if n == name)
+            return total or sum(v for (n, _), v in self.gauges.items() if n == name and v is not None)
+
+    def snapshot(self):
+        """JSON-serialisable view of every metric."""
+        with self._lock:
+            hists = {}
+            for (name, labels), h in self.histograms.items():
+                p50, p95 = h.percentile(50), h.percentile(95)
+                hists[_series(name, labels)] = {
+                    'count': h.count, 'sum': round(h.sum, 6),
+                    'mean': round(h.sum / h.count, 6) if h.count else None,
+                    'p50': round(p50, 6) if p50 is not None else None,
+                    'p95': round(p95, 6) if p95 is not None else None,
+                }
+            return {
+                'started': self.started,
+                'uptime_seconds': round(time.time() - self.started, 3),
+                'counters': {_series(n, l): v for (n, l), v in self.counters.items()},
+                'gauges': {_series(n, l): v for (n, l), v in self.gauges.items()},
+                'histograms': hists,
+            }
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        seen = set()
+
+        def declare(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), v in sorted(self.counters.items()):
+                full = f"{self.prefix}_{name}"
+                declare(full, "counter")
+                lines.append(f"{_series(full, labels)} {v}")
+            for (name, labels), v in sorted(self.gauges.items()):
+                if v is None:
+                    continue
+                full = f"{self.prefix}_{name}"
+                declare(full, "gauge")
+                lines.append(f"{_series(full, labels)} {v}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                full = f"{self.prefix}_{name}"
+                declare(full, "histogram")
+                cumulative = 0
+                for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    cumulative += count
+                    lines.append(f"{_series(full + '_bucket', labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{_series(full + '_sum', labels)} {h.sum}")
+                lines.append(f"{_series(full + '_count', labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by run.py and the checkpoint stores
+METRICS = Metrics()
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """Live throughput from the rows_written_total counter and ETA against the rows_target gauge.
+    The rate is smoothed (EWMA) across calls so one slow interval does not swing the ETA.
+    """
+
+    def __init__(self, metrics=METRICS, smoothing=0.3):
+        self.metrics = metrics
+        self.smoothing = smoothing
+        self._rate = None
+        self._last_rows = 0
+        self._last_time = time.monotonic()
+
+    def line(self):
+        now = time.monotonic()
+        rows = self.metrics.value('rows_written_total')
+        elapsed = now - self._last_time
+        current = (rows - self._last_rows) / elapsed if elapsed > 0 else 0.0
+        self._last_rows, self._last_time = rows, now
+        rate = current if self._rate is None else self.smoothing * current + (1 - self.smoothing) * self._rate
+        self._rate = rate
+        self.metrics.set('rows_per_second', round(rate, 2))
+        target = self.metrics.value('rows_target')
+        eta = ""
+        if target and rate > 0:
+            remaining = max(0, target - rows)
+            self.metrics.set('eta_seconds', round(remaining / rate, 1))
+            eta = f", ETA {format_duration(remaining / rate)}"
+        of = f"/{target}" if target else ""
+        return f"Progress: {rows}{of} rows, {rate:.1f} rows/s{eta}"
+
+
+class MetricsReporter:
+    """Background reporter: every `interval` seconds prints the progress line and writes
+    `path` (JSON snapshot); with `port`, serves /metrics (Prometheus) and /metrics.json.
+    """
+
+    def __init__(self, metrics=METRICS, path=None, interval=15.0, port=None, host="127.0.0.1"):
+        self.metrics = metrics
+        self.path = path
+        self.interval = max(1.0, float(interval))
+        self.port = port
+        self.host = host
+        self.progress = Progress(metrics)
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def start(self):
+        if self.port:
+            self._serve()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def report(self):
+        if self.metrics.value('rows_written_total') or self.metrics.value('rows_target'):
+            log(self.progress.line())
+        if self.path:
+            try:
+                self.write_file()
+            except Exception as e:
+                log(f"Could not write metrics file {self.path}: {e}", 'warning')
+
+    def write_file(self):
+        snapshot = self.metrics.snapshot()
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, default=str)
+        os.replace(tmp, self.path)
+
+    def _serve(self):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, ctype = json.dumps(metrics.snapshot(), default=str).encode(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, ctype = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, int(self.port)), Handler)
+        except OSError as e:
+            log(f"Metrics endpoint disabled, could not listen on {self.host}:{self.port}: {e}", 'warning')
+            return
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        log(f"Serving metrics at http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop reporting and write the final snapshot."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.report()
+        if self._server:
+            self._server.shutdown()
@@ -0,0 +1,151 @@
+"""Adaptive request pacing shared by the API and browser fetch paths.
+
+A token bucket limits the request rate and a semaphore-style counter limits requests in
+flight. Both are tuned by additive-increase/multiplicative-decrease: every successful
+request nudges the rate up, while HTTP 429/5xx, timeouts or a p90 latency well above the
+best seen so far cut it (at most once per cool-down, so one burst of failures counts once).
+Until the first cut the rate grows multiplicatively (slow start) so it finds the server's
+limit quickly. The in-flight limit follows the rate: rate x p90 latency (Little's law).
+
+Usage (from run.py):
+  ctl = RateController(rate=5, max_rate=50, max_concurrency=8)
+  start = ctl.acquire()
+  ... send request ...
+  ctl.release(start, status=resp.status_code)
+"""
+import math
+import threading
+import time
+from collections import deque
+
+
+class RateController:
+    """Token bucket + AIMD controller. Thread-safe; one instance per run."""
+
+    def __init__(self, rate=5.0, min_rate=0.2, max_rate=50.0, max_concurrency=8,
+                 increase=1.0, decrease=0.5, latency_factor=3.0, window=50):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency = min(self.max_concurrency, 2)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.latencies = deque(maxlen=window)
+        self.base_latency = None
+        self.slow_start = True
+        self.in_flight = 0
+        self.requests = 0
+        self.congestion_events = 0
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_cut = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Block until a token and an in-flight slot are free. Returns the start time for release()."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1 and self.in_flight < self.concurrency:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    self.requests += 1
+                    return now
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens < 1:
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = 1.0  # woken by release()
+                self._cond.wait(timeout=wait)
+
+    def release(self, start, status=None, timeout=False, error=False, throttled=False, retry_after=None):
+        """Record the outcome of a request started at `start` (from acquire()).
+        status: HTTP status code; timeout/error: the request did not complete normally;
+        throttled: the site pushed back some other way (e.g. a browser alert);
+        retry_after: seconds the server asked us to wait (Retry-After header).
+        """
+        now = time.monotonic()
+        latency = now - start
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            congested = timeout or throttled or status == 429 or (status is not None and status >= 500)
+            if not congested and not error:
+                self.latencies.append(latency)
+                p50 = self.percentile(50)
+                if self.base_latency is None or p50 < self.base_latency:
+                    self.base_latency = p50
+                else:
+                    # Let the baseline follow a lasting change in server latency, slowly
+                    self.base_latency += (p50 - self.base_latency) * 0.01
+                if len(self.latencies) >= 10 and self.percentile(90) > self.latency_factor * self.base_latency:
+                    congested = True
+            if congested:
+                self._cut(now, retry_after)
+            elif not error:
+                self._grow()
+            self._resize()
+            self._cond.notify_all()
+
+    def _grow(self):
+        if self.slow_start:
+            # Double roughly once per `rate` successes, i.e. about once a second
+            self.rate = min(self.max_rate, self.rate * (1 + 1.0 / max(1.0, self.rate)))
+        else:
+            # +increase requests/s for every second spent at the current rate
+            self.rate = min(self.max_rate, self.rate + self.increase / max(1.0, self.rate))
+
+    def _cut(self, now, retry_after=None):
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + float(retry_after))
+        # Requests already in flight will report the same congestion; count it once
+        cool_down = max(1.0, self.percentile(90) or 0.0)
+        if now - self._last_cut < cool_down:
+            return
+        self._last_cut = now
+        self.slow_start = False
+        self.congestion_events += 1
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.concurrency = max(1, int(self.concurrency * self.decrease))
+        # Judge the new rate on fresh samples only
+        self.latencies.clear()
+
+    def _resize(self):
+        p90 = self.percentile(90)
+        if p90:
+            wanted = int(math.ceil(self.rate * p90)) + 1
+            self.concurrency = max(1, min(self.max_concurrency, wanted))
+
+    def percentile(self, pct):
+        """Latency percentile (seconds) over the recent window, or None before any sample."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def stats(self):
+        """Current rate, concurrency limit, in-flight count and latency percentiles."""
+        with self._cond:
+            return {
+                'rate': round(self.rate, 2),
+                'concurrency': self.concurrency,
+                'in_flight': self.in_flight,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'requests': self.requests,
+                'congestion_events': self.congestion_events,
+            }
+
+    def describe(self):
+        s = self.stats()
+        p90 = f"{s['p90'] * 1000:.0f}ms" if s['p90'] is not None else "-"
+        return f"rate {s['rate']}/s, {s['in_flight']}/{s['concurrency']} in flight, p90 {p90}"
@@ -0,0 +1,108 @@
+"""Compact in-memory table of scraped Greenbook rows.
+
+Rows are stored column by column. Columns whose values repeat (Active Ingredient,
+Product Category, Dosage Form, Route, Strength, Applicant, Approval Date, Status) keep
+each distinct value once plus an array of 4-byte codes, instead of one string object
+per cell. Product Name and NAFDAC Reg No are close to unique and are kept as plain lists.
+
+A RecordTable behaves like the list of row lists it replaces: append/extend, len,
+iteration and indexing all work with rows as lists.
+"""
+from array import array
+
+from columns import REG_NO_INDEX
+
+# Column positions kept as plain strings (Product Name, NAFDAC Reg No)
+UNIQUE_COLUMNS = (0, REG_NO_INDEX)
+
+
+class RecordTable:
+    """List-like, column-wise row store with dictionary-coded repeated columns."""
+
+    __slots__ = ('unique_columns', '_columns', '_values', '_codes', '_widths')
+
+    def __init__(self, rows=None, unique_columns=UNIQUE_COLUMNS):
+        self.unique_columns = frozenset(unique_columns)
+        self._columns = []  # per column: list of values, or array('I') of codes
+        self._values = []   # per column: distinct values by code (None for plain columns)
+        self._codes = []    # per column: value -> code (None for plain columns)
+        self._widths = array('H')  # cells in each row; legacy rows are narrower
+        if rows:
+            self.extend(rows)
+
+    def _add_column(self):
+        n = len(self._widths)
+        if len(self._columns) in self.unique_columns:
+            self._columns.append([None] * n)
+            self._values.append(None)
+            self._codes.append(None)
+        else:
+            # Code 0 is the padding value for rows that end before this column
+            self._columns.append(array('I', [0]) * n)
+            self._values.append([None])
+            self._codes.append({None: 0})
+
+    def append(self, row):
+        width = len(row)
+        while len(self._columns) < width:
+            self._add_column()
+        for i, column in enumerate(self._columns):
+            value = row[i] if i < width else None
+            codes = self._codes[i]
+            if codes is None:
+                column.append(value)
+                continue
+            try:
+                code = codes.get(value)
+            except TypeError:
+                # Unhashable cell (nested JSON); keep its text
+                value = str(value)
+                code = codes.get(value)
+            if code is None:
+                code = len(self._values[i])
+                self._values[i].append(value)
+                codes[value] = code
+            column.append(code)
+        self._widths.append(width)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def _row(self, index):
+        cells = []
+        for i in range(self._widths[index]):
+            values = self._values[i]
+            cell = self._columns[i][index]
+            cells.append(cell if values is None else values[cell])
+        return cells
+
+    def __len__(self):
+        return len(self._widths)
+
+    def __iter__(self):
+        for index in range(len(self._widths)):
+            yield self._row(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self._widths)))]
+        if index < 0:
+            index += len(self._widths)
+        if not 0 <= index < len(self._widths):
+            raise IndexError("RecordTable index out of range")
+        return self._row(index)
+
+    def __add__(self, other):
+        table = RecordTable(self, unique_columns=self.unique_columns)
+        table.extend(other)
+        return table
+
+    def __radd__(self, other):
+        table = RecordTable(other, unique_columns=self.unique_columns)
+        table.extend(self)
+        return table
+
+    def distinct_values(self):
+        """Number of distinct values held per dictionary-coded column (None for plain columns)."""
+        return [len(v) - 1 if v is not None else None for v in self._values]
@@ -1,21 +1,48 @@
-from selenium import webdriver
-import argparse
 import os
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException, NoAlertPresentException, StaleElementReferenceException, InvalidSessionIdException
 import csv
-import traceback
-import requests
-from datetime import datetime
-from webdriver_manager.chrome import ChromeDriverManager
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
-from selenium.webdriver.common.alert import Alert
 import time
+from datetime import datetime
+from columns import GREENBOOK_COLUMNS, REG_NO_INDEX, APPROVAL_DATE_INDEX
+from records import RecordTable
+from metrics import METRICS, log, format_duration
+
+# selenium, webdriver_manager, openpyxl and requests are imported by the functions that use
+# them, so importing this module is cheap and HTTP-only runs never load the browser stack.
+# The command line lives in cli.py (py run.py [flags] still works).
+
+# Rows per page in the site's own DataTables view; checkpoint page numbers use this unit
+DISPLAY_PAGE_LENGTH = 10
+# Page sizes tried, in order, when negotiating a larger API page length
+PAGE_LENGTH_CANDIDATES = (100, 250, 500, 1000, 2500, 5000, 10000)
+# Stable server-side ordering (by NAFDAC Reg No) requested in API mode so offsets are reproducible
+API_ORDER_PARAMS = {'order[0][column]': REG_NO_INDEX, 'order[0][dir]': 'asc'}
+# Newest approvals first, used by --delta to stop at the first fully known page
+DELTA_ORDER_PARAMS = {'order[0][column]': APPROVAL_DATE_INDEX, 'order[0][dir]': 'desc'}
+# Records per request in --delta mode (a nightly delta is usually a page or two)
+DELTA_PAGE_LENGTH = 100
+# Site root; point it at a local stand-in (standin_server.py) with --base-url or GREENBOOK_BASE_URL
+BASE_URL = os.environ.get('GREENBOOK_BASE_URL', 'https://greenbook.nafdac.gov.ng/')
+# Discovered DataTables endpoints, one entry per site root (see discover_endpoint)
+ENDPOINT_CACHE_FILE = ".greenbook_endpoint.json"
+# Seconds a cached endpoint is trusted (after a passing probe) before it is discovered again
+ENDPOINT_TTL = 7 * 86400
+
+
+def order_label(params):
+    """Name of the server-side ordering in request `params` ('3:asc'), or 'default' for the site's own.
+    Checkpoints record it, since offsets only mean something in the order the rows were written in.
+    """
+    if params and 'order[0][column]' in params:
+        return f"{params['order[0][column]']}:{params.get('order[0][dir]', 'asc')}"
+    return 'default'
+
+
+def order_params(label):
+    """Request params for an order_label() name ({} for the site's default order)."""
+    if not label or label == 'default':
+        return {}
+    column, _, direction = str(label).partition(':')
+    return {'order[0][column]': int(column), 'order[0][dir]': direction or 'asc'}
 
 # Pre-run convenience: allow setting a start page via environment variable or a small file
 # Priority: CLI --start > START_PAGE env var > start_page.txt file > existing checkpoint detection
@@ -26,6 +53,10 @@ def compute_start_page_from_files(base_name="nafdac_greenbook_1400"):
     csv_path = base_name + ".csv"
     xlsx_path = base_name + ".xlsx"
     try:
+        summary = load_checkpoint_summary(csv_path, rebuild=False)
+        if summary:
+            count = summary['rows']
+            return (count // 10) + 1 if count else 1
         if os.path.exists(csv_path):
             with open(csv_path, newline='', encoding='utf-8') as f:
                 reader = csv.reader(f)
@@ -49,106 +80,542 @@ def compute_start_page_from_files(base_name="nafdac_greenbook_1400"):
         return None
     return None
 
-def save_to_excel(data, output_file):
-    import os
-    from datetime import datetime
-    
-    # Try to save to the main file first
-    def try_save(file_path, workbook):
+# Named styles shared by every cell, so a workbook holds one style record per kind
+# instead of a new Alignment/Border per cell
+HEADER_STYLE = "greenbook_header"
+CELL_STYLE = "greenbook_cell"
+
+
+def add_greenbook_styles(wb):
+    """Register the header and data-cell named styles on a workbook."""
+    from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment, Border, Side
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    header = NamedStyle(name=HEADER_STYLE, border=border,
+                        font=Font(bold=True, color="FFFFFF"),
+                        fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+                        alignment=Alignment(horizontal="center", vertical="center"))
+    cell = NamedStyle(name=CELL_STYLE, border=border, alignment=Alignment(vertical="center"))
+    for style in (header, cell):
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+
+
+def styled_row(ws, values, style):
+    """Return write-only cells for one row, all pointing at the same named style."""
+    from openpyxl.cell import WriteOnlyCell
+    cells = []
+    for value in values:
+        c = WriteOnlyCell(ws, value=value)
+        c.style = style
+        cells.append(c)
+    return cells
+
+
+def save_workbook(wb, output_file):
+    """Save `wb`, falling back to a timestamped backup (then the temp dir) if the file is locked."""
+    def try_save(file_path):
         try:
-            workbook.save(file_path)
+            wb.save(file_path)
             return True
         except PermissionError:
             return False
-            
-    # Create a new workbook and select active sheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "NAFDAC Greenbook"
-    
-    # Define headers
-    headers = [
-        "Product Name", "Active Ingredient", "Dosage Form",
-        "Product Category", "NAFDAC Reg No", "Applicant", 
-        "Manufacturer", "Approval Date"
-    ]
-    
-    # Write headers with styling
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    border = Border(
-        left=Side(style='thin'), 
-        right=Side(style='thin'), 
-        top=Side(style='thin'), 
-        bottom=Side(style='thin')
-    )
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = border
-        
-    # Write data
-    for row_idx, row_data in enumerate(data, 2):
-        for col_idx, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            cell.border = border
-            cell.alignment = Alignment(vertical="center")
-    
-    # Adjust column widths
-    for col in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col)
-        max_length = 0
-        column = ws[column_letter]
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2) * 1.2
-        ws.column_dimensions[column_letter].width = min(adjusted_width, 50)
-    
-    # Try to save the workbook with retry mechanism
-    if not try_save(output_file, wb):
-        # If main file is locked, create a backup file
-        backup_file = f"nafdac_greenbook_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        print(f"Main file is locked. Saving to backup file: {backup_file}")
-        if try_save(backup_file, wb):
-            print("Successfully saved to backup file")
-        else:
-            # If both fails, try saving to temp directory
-            temp_file = os.path.join(os.environ.get('TEMP', ''), backup_file)
-            if try_save(temp_file, wb):
-                print(f"Saved to temporary location: {temp_file}")
-            else:
-                raise Exception("Could not save file in any location")
 
+    if try_save(output_file):
+        return output_file
+    # If main file is locked, create a backup file
+    backup_file = f"nafdac_greenbook_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    print(f"Main file is locked. Saving to backup file: {backup_file}")
+    if try_save(backup_file):
+        print("Successfully saved to backup file")
+        return backup_file
+    # If both fails, try saving to temp directory
+    temp_file = os.path.join(os.environ.get('TEMP', ''), backup_file)
+    if try_save(temp_file):
+        print(f"Saved to temporary location: {temp_file}")
+        return temp_file
+    raise Exception("Could not save file in any location")
+
+
+def save_to_excel(data, output_file):
+    """Write `data` to a styled workbook in one streaming pass (write-only mode).
+    Column widths come from a single scan of the rows, made before anything is written.
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    headers = GREENBOOK_COLUMNS
+    widths = [len(h) for h in headers]
+    for row_data in data:
+        for i, value in enumerate(row_data):
+            l = len(str(value)) if value is not None else 0
+            if i >= len(widths):
+                widths.append(l)
+            elif l > widths[i]:
+                widths[i] = l
+
+    wb = Workbook(write_only=True)
+    add_greenbook_styles(wb)
+    ws = wb.create_sheet(title="NAFDAC Greenbook")
+    # Write-only sheets only honour widths set before the first row
+    for col, max_length in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(col)].width = min((max_length + 2) * 1.2, 50)
+
+    ws.append(styled_row(ws, headers, HEADER_STYLE))
+    for row_data in data:
+        ws.append(styled_row(ws, row_data, CELL_STYLE))
+    return save_workbook(wb, output_file)
+
+
+CSV_HEADER = GREENBOOK_COLUMNS
+
+
+def manifest_path(csv_path):
+    """Path of the checkpoint manifest sidecar for a CSV checkpoint."""
+    return os.path.splitext(csv_path)[0] + ".manifest.json"
+
+
+def read_manifest(csv_path):
+    """Return the manifest dict for a CSV checkpoint, or None if missing/unreadable."""
+    import json
+    try:
+        with open(manifest_path(csv_path), encoding='utf-8') as f:
+            m = json.load(f)
+        return m if isinstance(m, dict) else None
+    except Exception:
+        return None
+
+
+def write_manifest(csv_path, manifest, fsync=False):
+    """Atomically replace the manifest (write to a temp file, then rename over it).
+    With fsync=True the temp file is synced to disk before the rename.
+    """
+    import json
+    path = manifest_path(csv_path)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def scan_manifest(csv_path):
+    """Scan a CSV checkpoint once and return a fresh manifest for it, without writing anything."""
+    count = 0
+    last = None
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                count += 1
+                last = row
+    manifest = read_manifest(csv_path) or {}
+    manifest.update({
+        'rows': count,
+        'last_reg_no': last[REG_NO_INDEX] if last and len(last) > REG_NO_INDEX else None,
+        'csv_bytes': os.path.getsize(csv_path),
+        'last_page': (count // DISPLAY_PAGE_LENGTH) if count else None,
+        'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    manifest.pop('next_offset', None)
+    return manifest
+
+
+def rebuild_manifest(csv_path):
+    """Scan a CSV checkpoint once and write a fresh manifest for it. Returns the manifest."""
+    manifest = scan_manifest(csv_path)
+    write_manifest(csv_path, manifest)
+    print(f"Rebuilt checkpoint manifest for {csv_path} ({manifest['rows']} rows)")
+    return manifest
+
+
+def read_csv_tail_row(csv_path, end_bytes, window=65536):
+    """Return the last CSV row ending at byte `end_bytes`, reading only the file tail."""
+    with open(csv_path, 'rb') as f:
+        start = max(0, end_bytes - window)
+        f.seek(start)
+        chunk = f.read(end_bytes - start)
+    lines = [ln for ln in chunk.decode('utf-8', errors='replace').splitlines() if ln.strip()]
+    if not lines:
+        return None
+    return next(csv.reader([lines[-1]]), None)
+
+
+def load_checkpoint_summary(csv_path, rebuild=True):
+    """Return the checkpoint manifest for `csv_path` without reading the whole CSV.
+    The manifest is checked against the file size and the Reg No of the CSV's last row (tail_reg_no);
+    if it is missing or stale it is rebuilt with one full scan (only when rebuild=True).
+    Returns None if there is no checkpoint.
+    """
+    if not os.path.exists(csv_path):
+        return None
+    manifest = read_manifest(csv_path)
+    try:
+        if manifest and manifest.get('csv_bytes') == os.path.getsize(csv_path):
+            if not manifest.get('rows'):
+                return manifest
+            tail = read_csv_tail_row(csv_path, manifest['csv_bytes'])
+            if tail and len(tail) > REG_NO_INDEX and tail[REG_NO_INDEX] == manifest.get('tail_reg_no', manifest.get('last_reg_no')):
+                return manifest
+            print("Checkpoint manifest does not match the CSV tail")
+        elif manifest:
+            print("Checkpoint manifest is out of date with the CSV")
+    except Exception as e:
+        print(f"Checkpoint manifest check failed: {e}")
+    if not rebuild:
+        return None
+    return rebuild_manifest(csv_path)
+
+
+def uncommitted_tail_bytes(csv_path):
+    """Return how many bytes of a CSV checkpoint lie past its last commit point (the manifest's
+    csv_bytes), or 0 if there are none or the committed prefix no longer ends with the
+    manifest's last Reg No.
+    """
+    manifest = read_manifest(csv_path)
+    if not manifest or not os.path.exists(csv_path):
+        return 0
+    committed = manifest.get('csv_bytes')
+    size = os.path.getsize(csv_path)
+    if not isinstance(committed, int) or committed >= size:
+        return 0
+    if manifest.get('rows'):
+        tail = read_csv_tail_row(csv_path, committed)
+        expected = manifest.get('tail_reg_no', manifest.get('last_reg_no'))
+        if not tail or len(tail) <= REG_NO_INDEX or tail[REG_NO_INDEX] != expected:
+            return 0
+    return size - committed
+
+
+def truncate_uncommitted_tail(csv_path):
+    """Cut a CSV checkpoint back to its last commit point (the manifest's csv_bytes).
+    Bytes past it are rows from pages whose commit never happened (e.g. a crash), so they
+    are dropped and re-scraped rather than duplicated. Returns the number of bytes removed.
+    """
+    extra = uncommitted_tail_bytes(csv_path)
+    if not extra:
+        return 0
+    size = os.path.getsize(csv_path)
+    with open(csv_path, 'r+b') as f:
+        f.truncate(size - extra)
+    print(f"Discarded {extra} bytes of uncommitted rows from {csv_path}")
+    return extra
+
+
+class CsvCheckpoint:
+    """Default checkpoint store: the append-only CSV plus its manifest sidecar.
+
+    The CSV is opened once and kept open for the whole scrape. Pages are committed in groups,
+    every `commit_pages` pages or `commit_seconds` seconds: the file is flushed (and fsynced
+    with fsync=True), then the manifest is replaced with the new byte offset. That offset is
+    the commit point, so a torn tail left by a crash is truncated when the checkpoint is reopened.
+    """
+
+    kind = 'csv'
+
+    def __init__(self, csv_path, commit_pages=10, commit_seconds=5.0, fsync=False):
+        self.csv_path = csv_path
+        self.commit_pages = max(1, int(commit_pages or 1))
+        self.commit_seconds = commit_seconds
+        self.fsync = fsync
+        self._hashes = None
+        self._f = None
+        self._writer = None
+        self._manifest = None
+        self._pending = 0
+        self._last_commit = time.time()
+        self._recovered = False
+
+    def _recover(self):
+        # Before the checkpoint is first read or extended, drop any tail past the last commit
+        if not self._recovered:
+            truncate_uncommitted_tail(self.csv_path)
+            self._recovered = True
+
+    def _open(self):
+        if self._f is not None:
+            return
+        self._recover()
+        manifest = load_checkpoint_summary(self.csv_path)
+        new_file = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+        self._f = open(self.csv_path, "a", newline='', encoding='utf-8')
+        self._writer = csv.writer(self._f)
+        if new_file:
+            self._writer.writerow(CSV_HEADER)
+            manifest = {'rows': 0}
+        self._manifest = dict(manifest or {})
+        self._last_commit = time.time()
+
+    def write_page(self, rows, page=None, offset=None, endpoint=None, page_length=None, order=None):
+        """Buffer one page of rows; commits when the group is full or old enough.
+        page/offset/endpoint/page_length/order (see order_label) describe where the page came from.
+        """
+        if not rows:
+            return
+        self._open()
+        last = rows[-1]
+        if self._manifest.get('delta_rows'):
+            # A delta sync already appended records from past the resume point; keep one copy
+            rows, _ = self._unwritten(rows)
+            self._open()
+        with METRICS.timer('checkpoint_write_seconds', store='csv'):
+            for r in rows:
+                self._writer.writerow(r)
+        METRICS.inc('rows_written_total', len(rows))
+        METRICS.inc('pages_written_total')
+        m = self._manifest
+        m['rows'] = m.get('rows', 0) + len(rows)
+        m['last_reg_no'] = last[REG_NO_INDEX] if len(last) > REG_NO_INDEX else None
+        if rows:
+            m['tail_reg_no'] = rows[-1][REG_NO_INDEX] if len(rows[-1]) > REG_NO_INDEX else None
+        if page is not None:
+            m['last_page'] = page
+        if offset is not None:
+            m['next_offset'] = offset + len(rows)
+        if endpoint is not None:
+            m['endpoint'] = endpoint
+        if page_length is not None:
+            m['page_length'] = page_length
+        if order is not None:
+            m['order'] = order
+        self._pending += 1
+        if self._pending >= self.commit_pages or time.time() - self._last_commit >= self.commit_seconds:
+            self.commit()
+        if self._hashes is not None:
+            from sqlite_store import record_key, row_hash
+            for r in rows:
+                self._hashes[record_key(r)] = row_hash(r)
+
+    def write_delta(self, rows):
+        """Write delta-sync rows without moving the resume position (last_reg_no, last_page,
+        next_offset): new Reg Nos are appended, changed ones are rewritten where they stand.
+        Returns (inserted, updated) counts.
+        """
+        from sqlite_store import record_key, row_hash
+        new, changed = self._unwritten(rows)
+        if new:
+            self._open()
+            with METRICS.timer('checkpoint_write_seconds', store='csv'):
+                for r in new:
+                    self._writer.writerow(r)
+            m = self._manifest
+            m['rows'] = m.get('rows', 0) + len(new)
+            m['delta_rows'] = m.get('delta_rows', 0) + len(new)
+            m['tail_reg_no'] = new[-1][REG_NO_INDEX] if len(new[-1]) > REG_NO_INDEX else None
+            self._pending += 1
+            self.commit()
+            for r in new:
+                self._hashes[record_key(r)] = row_hash(r)
+        METRICS.inc('rows_written_total', len(new) + changed)
+        METRICS.inc('pages_written_total')
+        log(f"Store: {len(new)} new, {changed} updated rows", 'debug')
+        return len(new), changed
+
+    def _unwritten(self, rows):
+        """Rewrite the rows whose content changed in place and drop those already checkpointed.
+        Returns (rows still to append, number of rows rewritten).
+        """
+        from sqlite_store import record_key
+        states = [(r, self.row_state(r)) for r in rows]
+        changed = {record_key(r): r for r, state in states if state == 'changed'}
+        if changed:
+            self._replace_rows(changed)
+        return [r for r, state in states if state == 'new'], len(changed)
+
+    def _replace_rows(self, changed):
+        """Rewrite the CSV with the rows whose Reg No is a key of `changed` replaced in place."""
+        from sqlite_store import record_key, row_hash
+        self.close()
+        self._recover()
+        manifest = load_checkpoint_summary(self.csv_path) or {}
+        tmp = self.csv_path + ".tmp"
+        with open(self.csv_path, newline='', encoding='utf-8') as src, open(tmp, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            writer.writerow(next(reader, None) or CSV_HEADER)
+            for row in reader:
+                if any(cell.strip() for cell in row):
+                    row = changed.get(record_key(row), row)
+                writer.writerow(row)
+            if self.fsync:
+                dst.flush()
+                os.fsync(dst.fileno())
+        os.replace(tmp, self.csv_path)
+        manifest['csv_bytes'] = os.path.getsize(self.csv_path)
+        manifest['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        write_manifest(self.csv_path, manifest, fsync=self.fsync)
+        for key, row in changed.items():
+            self._hashes[key] = row_hash(row)
+
+    def commit(self):
+        """Make every buffered page durable and move the commit point past them."""
+        if self._f is None or not self._pending:
+            return
+        with METRICS.timer('checkpoint_commit_seconds', store='csv'):
+            self._f.flush()
+            if self.fsync:
+                os.fsync(self._f.fileno())
+            self._manifest['csv_bytes'] = os.fstat(self._f.fileno()).st_size
+            self._manifest['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            write_manifest(self.csv_path, self._manifest, fsync=self.fsync)
+        self._pending = 0
+        self._last_commit = time.time()
+
+    def summary(self, rebuild=True):
+        if self._f is not None:
+            self.commit()
+            return dict(self._manifest)
+        self._recover()
+        return load_checkpoint_summary(self.csv_path, rebuild=rebuild)
+
+    def row_state(self, row):
+        """Return 'new', 'changed' or 'known' for a scraped row.
+        The Reg No -> content hash index is built from the CSV on first use.
+        """
+        from sqlite_store import record_key, row_hash
+        if self._hashes is None:
+            self._hashes = {record_key(r): row_hash(r) for r in self.iter_rows()}
+        key = record_key(row)
+        if key not in self._hashes:
+            return 'new'
+        return 'known' if self._hashes[key] == row_hash(row) else 'changed'
+
+    def covers(self, offset, length):
+        """The CSV keeps no per-row provenance, so a gap can never be ruled out from it."""
+        return False
+
+    def insert_gap_rows(self, fills):
+        """Splice gap rows into the CSV at their original positions in one streaming rewrite.
+        `fills` are dicts with 'position' (checkpoint rows that precede the gap) and 'rows'.
+        Rows whose Reg No is already checkpointed are dropped. Returns the number inserted.
+        """
+        from sqlite_store import record_key
+        self.close()
+        self._recover()
+        known = {record_key(r) for r in self.iter_rows()}
+        before = read_manifest(self.csv_path) or {}
+        pending = sorted(((f['position'], [r for r in f['rows'] if record_key(r) not in known]) for f in fills),
+                         key=lambda f: f[0])
+        if not os.path.exists(self.csv_path):
+            with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(CSV_HEADER)
+
+        inserted = 0
+        last = None
+        tmp = self.csv_path + ".tmp"
+        with open(self.csv_path, newline='', encoding='utf-8') as src, open(tmp, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            writer.writerow(next(reader, None) or CSV_HEADER)
+            k = 0
+            for row in reader:
+                if any(cell.strip() for cell in row):
+                    while pending and pending[0][0] <= k:
+                        gap_rows = pending.pop(0)[1]
+                        writer.writerows(gap_rows)
+                        inserted += len(gap_rows)
+                    last = row
+                    k += 1
+                writer.writerow(row)
+            for _, gap_rows in pending:
+                writer.writerows(gap_rows)
+                inserted += len(gap_rows)
+                if gap_rows:
+                    last = gap_rows[-1]
+            if self.fsync:
+                dst.flush()
+                os.fsync(dst.fileno())
+        os.replace(tmp, self.csv_path)
+
+        manifest = read_manifest(self.csv_path) or {}
+        tail = last[REG_NO_INDEX] if last and len(last) > REG_NO_INDEX else None
+        manifest.update({
+            'rows': manifest.get('rows', 0) + inserted,
+            'tail_reg_no': tail,
+            'csv_bytes': os.path.getsize(self.csv_path),
+            'updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        # Rows appended past the resume row move it, unless delta rows already sit after it
+        if before.get('tail_reg_no', before.get('last_reg_no')) == before.get('last_reg_no'):
+            manifest['last_reg_no'] = tail
+        write_manifest(self.csv_path, manifest, fsync=self.fsync)
+        self._hashes = None
+        return inserted
+
+    def iter_rows(self):
+        self.commit()
+        self._recover()
+        if not os.path.exists(self.csv_path):
+            return
+        with open(self.csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if any(cell.strip() for cell in row):
+                    yield row
+
+    def close(self):
+        if self._f is None:
+            return
+        try:
+            self.commit()
+        finally:
+            self._f.close()
+            self._f = None
+
+
+def open_store(kind, output_file, commit_pages=10, commit_seconds=5.0, fsync=False):
+    """Return the checkpoint store for `output_file`: 'csv' (default) or 'sqlite'.
+    commit_pages/commit_seconds/fsync set the CSV writer's group-commit policy.
+    """
+    base = os.path.splitext(output_file)[0]
+    if kind == 'sqlite':
+        from sqlite_store import SQLiteStore
+        return SQLiteStore(base + ".sqlite3")
+    return CsvCheckpoint(base + ".csv", commit_pages=commit_pages, commit_seconds=commit_seconds, fsync=fsync)
+
+
+def read_store_summary(kind, output_file):
+    """Return the checkpoint summary for `output_file` without opening the store for writing:
+    no tail recovery, manifest rewrite or database creation. None if there is no checkpoint.
+    """
+    base = os.path.splitext(output_file)[0]
+    if kind == 'sqlite':
+        from sqlite_store import read_summary
+        return read_summary(base + ".sqlite3")
+    csv_path = base + ".csv"
+    if not os.path.exists(csv_path):
+        return None
+    if uncommitted_tail_bytes(csv_path):
+        # Reopening would cut the file back to the manifest's commit point
+        return read_manifest(csv_path)
+    return load_checkpoint_summary(csv_path, rebuild=False) or scan_manifest(csv_path)
+
+
+def export_store(store, output_file, csv_only=False):
+    """Regenerate the CSV (and, unless csv_only, XLSX) outputs from a SQLite store."""
+    csv_path = os.path.splitext(output_file)[0] + ".csv"
+    count, last = store.export_csv(csv_path, CSV_HEADER)
+    summary = store.summary()
+    summary.update({'rows': count, 'last_reg_no': last[REG_NO_INDEX] if last and len(last) > REG_NO_INDEX else None,
+                    'csv_bytes': os.path.getsize(csv_path)})
+    write_manifest(csv_path, summary)
+    print(f"Exported {count} stored records to {csv_path}")
+    if not csv_only:
+        csv_to_excel_stream(csv_path, output_file)
 
-def append_rows_to_csv(rows, csv_path):
-    """Append rows (list of lists) to a CSV file. Creates file with header if missing."""
-    if not rows:
-        return
-    header = [
-        "Product Name", "Active Ingredient", "Dosage Form",
-        "Product Category", "NAFDAC Reg No", "Applicant",
-        "Manufacturer", "Approval Date"
-    ]
-    exists = os.path.exists(csv_path)
-    with open(csv_path, "a", newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        if not exists:
-            writer.writerow(header)
-        for r in rows:
-            writer.writerow(r)
 
 def load_existing_data(output_file):
     # Prefer CSV checkpoint if available for faster/resilient resume
     csv_file = os.path.splitext(output_file)[0] + ".csv"
-    data = []
+    # Column-wise store with shared values for repeated columns (see records.py)
+    data = RecordTable()
     try:
         if os.path.exists(csv_file):
             with open(csv_file, newline='', encoding='utf-8') as f:
@@ -176,36 +643,332 @@ def load_existing_data(output_file):
         return data, last_page
     except Exception as e:
         print(f"No existing data found or error loading file: {e}")
-        return [], 1
+        return RecordTable(), 1
 
 
-def log_skipped_page(page, reason, log_path="skipped_pages.log"):
+def log_skipped_page(page, reason, log_path="skipped_pages.log", offset=None, length=None):
+    METRICS.inc('pages_skipped_total')
     try:
         ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        extra = ""
+        if offset is not None:
+            extra = f"\toffset:{offset}\tlength:{length}"
+        # Keep each entry on one line so the log can be read back (see read_skip_log)
+        reason = " ".join(str(reason).split())
         with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(f"{ts}\tpage:{page}\treason:{reason}\n")
+            f.write(f"{ts}\tpage:{page}{extra}\treason:{reason}\n")
     except Exception as e:
         print(f"Failed to write skip log: {e}")
 
 
+def read_skip_log(log_path="skipped_pages.log"):
+    """Parse the skip log into a list of entries (dicts with page, offset, length, reason, resolved).
+    Older entries whose reason spanned several lines are folded back into one entry.
+    Each entry keeps its raw `lines` so the log can be rewritten (see mark_skips_resolved).
+    """
+    import re
+    entries = []
+    if not os.path.exists(log_path):
+        return entries
+    start = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\tpage:")
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not start.match(line):
+                if entries:
+                    entries[-1]['lines'].append(line)
+                continue
+            fields = line.split("\t")
+            entry = {'ts': fields[0], 'page': None, 'offset': None, 'length': None,
+                     'resolved': None, 'reason': '', 'lines': [line]}
+            for i, field in enumerate(fields[1:], 1):
+                key, _, value = field.partition(":")
+                if key == 'reason':
+                    entry['reason'] = "\t".join(fields[i:])[len("reason:"):]
+                    break
+                if key in ('page', 'offset', 'length'):
+                    try:
+                        entry[key] = int(value)
+                    except ValueError:
+                        pass
+                elif key == 'resolved':
+                    entry['resolved'] = value
+            entries.append(entry)
+    return entries
+
+
+def mark_skips_resolved(log_path, entries):
+    """Rewrite the skip log with a resolved:<timestamp> field on each of `entries`."""
+    if not entries:
+        return
+    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    # Entries are matched on their first line, since `entries` may come from an earlier read
+    first_lines = {e['lines'][0] for e in entries}
+    tmp = log_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for e in read_skip_log(log_path):
+            lines = list(e['lines'])
+            if lines[0] in first_lines and not e['resolved']:
+                # ts, page:N, then the rest of the entry
+                fields = lines[0].split("\t", 2)
+                fields.insert(2, f"resolved:{ts}")
+                lines[0] = "\t".join(fields)
+            f.write("\n".join(lines) + "\n")
+    os.replace(tmp, log_path)
+
+
 def csv_to_excel_stream(csv_path, excel_path):
-    """Convert CSV to XLSX using openpyxl write-only workbook to avoid heavy memory/time cost."""
-    from openpyxl import Workbook
-    wb = Workbook(write_only=True)
-    ws = wb.create_sheet(title="NAFDAC Greenbook")
+    """Convert CSV to XLSX with csv_to_xlsx (write-only workbook, column widths, sheet rollover).
+    Returns True once the workbook is saved.
+    """
+    from csv_to_xlsx import csv_to_xlsx
+    with METRICS.timer('excel_save_seconds', kind='final'):
+        try:
+            csv_to_xlsx(csv_path, excel_path, progress_every=0, save=save_workbook)
+        except Exception as e:
+            print(f"Failed to write Excel from CSV: {e}")
+            return False
+    return True
 
-    # Read CSV and write rows directly
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for r in reader:
-            ws.append(r)
 
-    # Ensure parent dir exists
+# URL patterns blocked in the lean browser profile (images, fonts, stylesheets, analytics)
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.css",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*",
+]
+
+# Chromedriver path resolved for this run (see resolve_chromedriver)
+_CHROMEDRIVER_PATH = None
+
+
+def local_chrome_version():
+    """Return the installed Chrome version string, or None if it cannot be determined."""
+    try:
+        from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+        return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception:
+        return None
+
+
+def resolve_chromedriver(cache_file=".chromedriver.json"):
+    """Return a chromedriver path, resolving it at most once per run.
+    The path is also persisted in `cache_file` together with the Chrome version it was
+    resolved for, so later runs skip webdriver_manager unless Chrome has been upgraded.
+    """
+    global _CHROMEDRIVER_PATH
+    import json
+    if _CHROMEDRIVER_PATH and os.path.exists(_CHROMEDRIVER_PATH):
+        return _CHROMEDRIVER_PATH
+
+    version = local_chrome_version()
     try:
-        wb.save(excel_path)
-        print(f"Converted CSV checkpoint to Excel: {excel_path}")
+        with open(cache_file, encoding='utf-8') as f:
+            cached = json.load(f)
+        if os.path.exists(cached.get('path', '')) and (version is None or cached.get('chrome_version') == version):
+            _CHROMEDRIVER_PATH = cached['path']
+            return _CHROMEDRIVER_PATH
+    except Exception:
+        pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'path': _CHROMEDRIVER_PATH, 'chrome_version': version}, f)
+    except Exception as e:
+        print(f"Could not cache chromedriver path: {e}")
+    return _CHROMEDRIVER_PATH
+
+
+def apply_lean_profile(options):
+    """Configure ChromeOptions to skip work the scraper does not need."""
+    options.page_load_strategy = 'eager'
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.managed_default_content_settings.plugins": 2,
+    })
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-sync")
+    options.add_argument("--no-first-run")
+    return options
+
+
+def block_nonessential_requests(driver, patterns=LEAN_BLOCKED_URLS):
+    """Block non-essential resource URLs in this browser session via CDP."""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+    except Exception as e:
+        print(f"Could not set blocked URLs: {e}")
+
+
+# Collects the text of every cell in the visible table page in a single execute_script call
+TABLE_ROWS_JS = ("return (function(){"
+                 "var out = [];"
+                 "var trs = document.querySelectorAll('table.dataTable tbody tr');"
+                 "for (var i=0;i<trs.length;i++){"
+                 " var tds = trs[i].querySelectorAll('td'); var row = [];"
+                 " for (var j=0;j<tds.length;j++){ row.push((tds[j].innerText || tds[j].textContent || '').trim()); }"
+                 " if (row.length) out.push(row); }"
+                 "return out; })();")
+
+
+@METRICS.timer('row_extraction_seconds', source='dom')
+def extract_table_rows(driver):
+    """Return the rows of the current table page as lists of cell text.
+    Uses one execute_script round trip; falls back to walking the DOM element by element.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import InvalidSessionIdException
+    try:
+        rows = driver.execute_script(TABLE_ROWS_JS)
+        if isinstance(rows, list):
+            return [[str(c).strip() if c is not None else '' for c in r] for r in rows]
+    except InvalidSessionIdException:
+        raise
+    except Exception as e:
+        log(f"Scripted row extraction failed ({e}); falling back to DOM walk", 'warning')
+
+    page_data = []
+    for row in driver.find_elements(By.CSS_SELECTOR, "table.dataTable tbody tr"):
+        try:
+            cells = row.find_elements(By.TAG_NAME, "td")
+            row_data = [cell.text.strip() for cell in cells]
+            if row_data:
+                page_data.append(row_data)
+        except Exception:
+            continue
+    return page_data
+
+
+# Installs draw.dt / xhr.dt counters on the table (once per document) and returns the draw count
+DRAW_COUNTER_JS = ("return (function(){"
+                   "if (typeof window.__gbDraws === 'number') return window.__gbDraws;"
+                   "var tbl = document.querySelector('table.dataTable');"
+                   "if (!tbl || !window.jQuery) return null;"
+                   "window.__gbDraws = 0; window.__gbXhr = 0;"
+                   "jQuery(tbl).on('draw.dt', function(){ window.__gbDraws++; });"
+                   "jQuery(tbl).on('xhr.dt', function(){ window.__gbXhr++; });"
+                   "return 0; })();")
+
+# Actual redraw wait time versus the fixed sleeps it replaced (fast navigation mode)
+NAV_WAIT_STATS = {'waits': 0, 'waited': 0.0, 'budget': 0.0, 'timeouts': 0}
+
+
+def table_draw_count(driver):
+    """Return the number of DataTables redraws seen so far, or None if the hook cannot be installed."""
+    from selenium.common.exceptions import InvalidSessionIdException
+    try:
+        res = driver.execute_script(DRAW_COUNTER_JS)
+        return int(res) if res is not None else None
+    except InvalidSessionIdException:
+        raise
+    except Exception:
+        return None
+
+
+def wait_for_table_draw(driver, prev_count, timeout=10, budget=0.0):
+    """Block until the table has redrawn since `prev_count` or `timeout` seconds pass.
+    `budget` is the fixed sleep this wait replaces; both are recorded in NAV_WAIT_STATS.
+    Returns the seconds waited, or None on timeout.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    t0 = time.time()
+    NAV_WAIT_STATS['budget'] += budget
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.05).until(
+            lambda d: (table_draw_count(d) or 0) > prev_count)
+        waited = time.time() - t0
+        NAV_WAIT_STATS['waits'] += 1
+        NAV_WAIT_STATS['waited'] += waited
+        return waited
+    except TimeoutException:
+        NAV_WAIT_STATS['timeouts'] += 1
+        NAV_WAIT_STATS['waited'] += time.time() - t0
+        return None
+
+
+def report_nav_wait_stats():
+    st = NAV_WAIT_STATS
+    if st['waits'] or st['timeouts'] or st['budget']:
+        avg = st['waited'] / st['waits'] if st['waits'] else 0.0
+        print(f"Navigation waits: {st['waits']} redraws ({st['timeouts']} timeouts), "
+              f"{st['waited']:.1f}s waited (avg {avg:.2f}s) vs {st['budget']:.1f}s fixed-sleep budget")
+
+
+# Network requests seen in the performance log, by CDP requestId (see read_datatables_xhr)
+_XHR_REQUESTS = {}
+
+
+def enable_network_capture(options):
+    """Turn on Chrome performance logging so DataTables XHR responses can be read back."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def read_datatables_xhr(driver):
+    """Drain the performance log and return DataTables JSON responses received since the last call.
+    Each item is a dict with the request url, method, post_data and the decoded payload.
+    """
+    import json
+    import base64
+    try:
+        entries = driver.get_log('performance')
     except Exception as e:
-        print(f"Failed to write Excel from CSV: {e}")
+        print(f"Performance log unavailable: {e}")
+        return []
+
+    response_ids = []
+    for entry in entries:
+        try:
+            msg = json.loads(entry['message'])['message']
+        except Exception:
+            continue
+        params = msg.get('params', {})
+        if msg.get('method') == 'Network.requestWillBeSent':
+            req = params.get('request', {})
+            _XHR_REQUESTS[params.get('requestId')] = {
+                'url': req.get('url'), 'method': req.get('method', 'GET'), 'post_data': req.get('postData')}
+        elif msg.get('method') == 'Network.responseReceived':
+            mime = params.get('response', {}).get('mimeType', '')
+            if params.get('type') in ('XHR', 'Fetch') or 'json' in mime:
+                response_ids.append(params.get('requestId'))
+
+    captured = []
+    for rid in response_ids:
+        req = _XHR_REQUESTS.pop(rid, None)
+        if not req:
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': rid})
+            text = body.get('body', '')
+            if body.get('base64Encoded'):
+                text = base64.b64decode(text).decode('utf-8', errors='replace')
+            payload = json.loads(text)
+        except Exception:
+            continue
+        if isinstance(payload, dict) and ('data' in payload or 'aaData' in payload):
+            captured.append(dict(req, payload=payload))
+    return captured
+
+
+def replay_params_from_xhr(xhr):
+    """Split a captured DataTables request into (endpoint url, params without start/length/draw)."""
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl
+    parts = urlsplit(xhr['url'])
+    url = urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+    if str(xhr.get('method', 'GET')).upper() == 'POST' and xhr.get('post_data'):
+        pairs = parse_qsl(xhr['post_data'], keep_blank_values=True)
+    else:
+        pairs = parse_qsl(parts.query, keep_blank_values=True)
+    params = {k: v for k, v in pairs if k not in ('start', 'length', 'draw', '_')}
+    return url, params
 
 
 def detect_datatables_ajax(driver):
@@ -234,10 +997,12 @@ def detect_datatables_ajax(driver):
         return None, None
 
 
-def detect_ajax_from_html(html, base_url="https://greenbook.nafdac.gov.ng/"):
+def detect_ajax_from_html(html, base_url=None):
     """Try to find a DataTables ajax URL in the HTML (fallback for --force-api).
+    Relative URLs are resolved against base_url (default BASE_URL).
     Returns absolute URL or None."""
     import re
+    base_url = base_url or BASE_URL
     # common patterns: "ajax": "URL"  or ajax: { url: 'URL' }
     patterns = [r'"ajax"\s*:\s*"([^"]+)"', r"ajax\s*:\s*\{\s*url\s*:\s*'([^']+)'",
                 r"ajax\s*:\s*'([^']+)'", r'ajax\s*:\s*\{\s*url\s*:\s*\"([^\"]+)\"']
@@ -253,92 +1018,561 @@ def detect_ajax_from_html(html, base_url="https://greenbook.nafdac.gov.ng/"):
     return None
 
 
-def api_scrape(ajax_url, start_page, end_page, csv_checkpoint, cookies=None, headers=None, page_length=10):
-    """Scrape pages via the DataTables server-side AJAX endpoint and append rows to CSV checkpoint.
-    Returns total rows scraped.
+def table_columns_from_html(html):
+    """Header cell texts of the first table head in the HTML, in column order."""
+    import re
+    from html import unescape
+    m = re.search(r'<thead[^>]*>(.*?)</thead>', html or '', re.S | re.I)
+    if not m:
+        return []
+    return [unescape(re.sub(r'<[^>]+>', '', th)).strip() for th in re.findall(r'<th[^>]*>(.*?)</th>', m.group(1), re.S | re.I)]
+
+
+def endpoint_entry(url, method='GET', params=None, headers=None, cookies=None, columns=None, server_side=True, max_length=None, source='html'):
+    """Everything needed to page through a DataTables endpoint without the browser."""
+    return {'url': url, 'method': method, 'params': dict(params or {}), 'headers': dict(headers or {}),
+            'cookies': [{'name': c['name'], 'value': c.get('value', '')} for c in (cookies or [])],
+            'columns': list(columns or []), 'server_side': bool(server_side), 'max_length': max_length,
+            'source': source, 'discovered': time.time()}
+
+
+def load_endpoint(base_url, cache_file=ENDPOINT_CACHE_FILE, ttl=ENDPOINT_TTL):
+    """Return the cached endpoint entry for `base_url`, or None if there is none or it is older than `ttl`."""
+    import json
+    if not cache_file:
+        return None
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            entry = json.load(f).get(base_url)
+    except Exception:
+        return None
+    if not entry or not entry.get('url'):
+        return None
+    if ttl and time.time() - entry.get('discovered', 0) > ttl:
+        print(f"Cached endpoint for {base_url} is older than {format_duration(ttl)}; discovering it again")
+        return None
+    return entry
+
+
+def save_endpoint(base_url, entry, cache_file=ENDPOINT_CACHE_FILE):
+    """Store `entry` as the endpoint of `base_url` (None removes it); other sites' entries are kept."""
+    import json
+    if not cache_file:
+        return
+    try:
+        with open(cache_file, encoding='utf-8') as f:
+            entries = json.load(f)
+    except Exception:
+        entries = {}
+    if entry is None:
+        if entries.pop(base_url, None) is None:
+            return
+    else:
+        entries[base_url] = entry
+    try:
+        tmp = cache_file + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, cache_file)
+    except Exception as e:
+        print(f"Could not cache endpoint: {e}")
+
+
+def probe_endpoint(session, entry, timeout=20):
+    """Check that an endpoint still answers like the cached entry says, with one single-record request.
+    The request bypasses the response cache so a stored page cannot vouch for a dead endpoint,
+    but is paced and counted by the session's rate controller like any other request.
+    Returns recordsTotal (the row count if the server sends none), or None if the probe fails.
+    """
+    params = dict(entry.get('params') or {}, start=0, length=1, draw=1)
+    try:
+        with METRICS.timer('endpoint_probe_seconds'):
+            payload = api_request(session, entry['url'], params, method=entry.get('method', 'GET'),
+                                  timeout=timeout, use_cache=False)
+            data, total = parse_api_payload(payload)
+    except Exception as e:
+        print(f"Endpoint probe of {entry['url']} failed: {e}")
+        return None
+    if not data:
+        print(f"Endpoint probe of {entry['url']} returned no rows")
+        return None
+    columns = entry.get('columns')
+    width = len(normalize_api_rows(data[:1])[0])
+    if columns and width != len(columns):
+        print(f"Endpoint probe of {entry['url']} returned {width} columns, expected {len(columns)}")
+        return None
+    if entry.get('server_side') and total is None:
+        print(f"Endpoint probe of {entry['url']} returned no recordsTotal; it is not server-side any more")
+        return None
+    return total if total is not None else len(data)
+
+
+def discover_endpoint(session, base_url, cache_file=ENDPOINT_CACHE_FILE, ttl=ENDPOINT_TTL, discover=True):
+    """Return the DataTables endpoint entry for `base_url` and apply its headers/cookies to `session`.
+    A cached entry younger than `ttl` is used if it passes probe_endpoint; otherwise (and only
+    with discover=True) the endpoint is looked up in the site HTML and cached for later runs.
+    Returns None if no working endpoint is known (the browser has to find it).
+    """
+    entry = load_endpoint(base_url, cache_file, ttl)
+    if entry:
+        update_http_session(session, cookies=entry.get('cookies'), headers=entry.get('headers'))
+        if probe_endpoint(session, entry) is not None:
+            METRICS.inc('endpoint_cache_total', result='hit')
+            print(f"Using cached {entry.get('source', 'html')} endpoint {entry['url']} "
+                  f"(discovered {format_duration(time.time() - entry.get('discovered', time.time()))} ago)")
+            return entry
+        METRICS.inc('endpoint_cache_total', result='stale')
+        save_endpoint(base_url, None, cache_file)
+    else:
+        METRICS.inc('endpoint_cache_total', result='miss')
+    if not discover:
+        return None
+    try:
+        html = session.get(base_url, timeout=20).text
+    except Exception as e:
+        print(f"Failed to fetch main page for endpoint detection: {e}")
+        return None
+    url = detect_ajax_from_html(html, base_url=base_url)
+    if not url:
+        return None
+    print(f"Detected ajax endpoint from HTML: {url}")
+    entry = endpoint_entry(url, headers={'Referer': base_url}, columns=table_columns_from_html(html),
+                           cookies=[{'name': c.name, 'value': c.value} for c in session.cookies])
+    if probe_endpoint(session, entry) is not None:
+        save_endpoint(base_url, entry, cache_file)
+    return entry
+
+
+def make_rate_controller(max_rate=50.0, workers=1):
+    """Return the run's RateController; --workers is its concurrency ceiling."""
+    from rate_control import RateController
+    return RateController(max_rate=max_rate, max_concurrency=max(1, int(workers or 1)))
+
+
+def make_response_cache(cache_dir=".http_cache", ttl=86400, max_mb=500, offline=False):
+    """Return the run's on-disk ResponseCache, or None when cache_dir is empty (--no-cache)."""
+    if not cache_dir:
+        return None
+    from http_cache import ResponseCache
+    return ResponseCache(cache_dir, ttl=ttl, max_bytes=int(max_mb * 1024 * 1024), offline=offline)
+
+
+def make_http_session(cookies=None, headers=None, pool_size=10, retries=3, controller=None, cache=None):
+    """Return a requests.Session with a keep-alive connection pool and retry/backoff.
+    Create one per run and pass it to every API helper so connections are reused.
+    With a RateController (rate_control.py) every request made through api_request is paced
+    by it; 429/5xx responses are then left to the controller instead of urllib3's retry.
+    With a ResponseCache (http_cache.py) api_request answers from, and fills, the cache.
     """
-    s = requests.Session()
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.controller = controller
+    session.cache = cache
+    retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=0.5,
+                  status_forcelist=() if controller else (429, 500, 502, 503, 504), allowed_methods=None,
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    update_http_session(session, cookies=cookies, headers=headers)
+    return session
+
+
+def update_http_session(session, cookies=None, headers=None):
+    """Apply headers and Selenium-style cookie dicts to an existing session."""
     if headers:
-        s.headers.update(headers)
+        session.headers.update(headers)
     if cookies:
         for c in cookies:
-            s.cookies.set(c['name'], c.get('value',''))
+            session.cookies.set(c['name'], c.get('value',''))
+    return session
+
+
+def normalize_api_rows(data):
+    """Normalize a DataTables data array into a list of row lists."""
+    page_rows = []
+    for row in data:
+        if isinstance(row, dict):
+            # preserve order by keys if possible, else values()
+            vals = list(row.values())
+            page_rows.append(vals)
+        elif isinstance(row, (list, tuple)):
+            page_rows.append(list(row))
+        else:
+            page_rows.append([str(row)])
+    return page_rows
 
-    total_rows = 0
-    for page in range(start_page, end_page + 1):
-        start = (page - 1) * page_length
-        params = {
-            'start': start,
-            'length': page_length,
-            'draw': page
-        }
+
+class DataTablesError(RuntimeError):
+    """The endpoint answered with a DataTables error payload or an unexpectedly short page."""
+
+
+def parse_api_payload(j):
+    """Return (data array, recordsTotal or None) from a DataTables JSON response."""
+    if isinstance(j, dict):
+        total = j.get('recordsFiltered', j.get('recordsTotal', j.get('iTotalRecords')))
         try:
-            resp = s.get(ajax_url, params=params, timeout=30)
-            resp.raise_for_status()
-            j = resp.json()
-            data = None
-            if isinstance(j, dict):
-                data = j.get('data') or j.get('aaData')
-            elif isinstance(j, list):
-                data = j
-            if not data:
-                print(f"No data returned for page {page} (status {resp.status_code})")
-                break
+            total = int(total) if total is not None else None
+        except (TypeError, ValueError):
+            total = None
+        return j.get('data') or j.get('aaData') or [], total
+    if isinstance(j, list):
+        return j, None
+    return [], None
 
-            # Normalize rows: if rows are dicts, take values; if lists, use directly
-            page_rows = []
-            for row in data:
-                if isinstance(row, dict):
-                    # preserve order by keys if possible, else values()
-                    vals = list(row.values())
-                    page_rows.append(vals)
-                elif isinstance(row, (list, tuple)):
-                    page_rows.append(list(row))
-                else:
-                    page_rows.append([str(row)])
 
-            append_rows_to_csv(page_rows, csv_checkpoint)
-            total_rows += len(page_rows)
-            print(f"API scraped page {page}: {len(page_rows)} rows (total {total_rows})")
+def report_pacing(controller):
+    """Export the controller's live state: rate and in-flight limits and requests in flight.
+    Called after every acquire() and release().
+    """
+    METRICS.set('request_rate_limit', round(controller.rate, 2))
+    METRICS.set('requests_in_flight_limit', controller.concurrency)
+    METRICS.set('requests_in_flight', controller.in_flight)
 
-            # If fewer than page_length returned, probably last page
-            if len(page_rows) < page_length:
-                break
 
+def api_request(session, ajax_url, params, method='GET', timeout=30, use_cache=True):
+    """Send one DataTables request (query string for GET, form body for POST); return the decoded JSON.
+    If the session has a response cache, fresh cached pages are returned without a request and
+    stale ones are revalidated (304 Not Modified); in offline mode a miss raises OfflineCacheMiss.
+    use_cache=False sends the request regardless and leaves the cache untouched.
+    If the session has a rate controller the request waits for it and reports its outcome.
+    """
+    import json
+    import requests
+    cache = getattr(session, 'cache', None) if use_cache else None
+    key = entry = None
+    extra_headers = {}
+    if cache:
+        key, entry = cache.lookup(ajax_url, params, method)
+        if entry and (entry['fresh'] or cache.offline):
+            cache.hits += 1
+            METRICS.inc('api_cache_hits_total')
+            return json.loads(entry['body'])
+        if cache.offline:
+            from http_cache import OfflineCacheMiss
+            raise OfflineCacheMiss(f"offline: no cached response for start={params.get('start')} length={params.get('length')}")
+        extra_headers = cache.conditional_headers(entry)
+
+    controller = getattr(session, 'controller', None)
+    start = None
+    if controller:
+        start = controller.acquire()
+        report_pacing(controller)
+    t0 = time.perf_counter()
+    try:
+        if str(method).upper() == 'POST':
+            resp = session.post(ajax_url, data=params, timeout=timeout, headers=extra_headers)
+        else:
+            resp = session.get(ajax_url, params=params, timeout=timeout, headers=extra_headers)
+    except requests.Timeout:
+        METRICS.inc('api_requests_total', status='timeout')
+        if controller:
+            controller.release(start, timeout=True)
+            report_pacing(controller)
+        raise
+    except Exception:
+        METRICS.inc('api_requests_total', status='error')
+        if controller:
+            controller.release(start, error=True)
+            report_pacing(controller)
+        raise
+    METRICS.observe('api_request_seconds', time.perf_counter() - t0)
+    METRICS.inc('api_requests_total', status=str(resp.status_code))
+    payload = None
+    if resp.status_code == 200:
+        try:
+            payload = resp.json()
+        except ValueError:
+            pass
+    # The site's "Too many requests" alert arrives as a 200 with an `error` key
+    error = payload.get('error') if isinstance(payload, dict) else None
+    if controller:
+        try:
+            retry_after = float(resp.headers.get('Retry-After') or 0)
+        except ValueError:
+            retry_after = None
+        controller.release(start, status=resp.status_code, retry_after=retry_after, throttled=bool(error))
+        report_pacing(controller)
+    if cache and entry and resp.status_code == 304:
+        cache.refresh(key)
+        cache.revalidated += 1
+        return json.loads(entry['body'])
+    resp.raise_for_status()
+    if error:
+        METRICS.inc('api_error_payloads_total')
+        raise DataTablesError(f"DataTables error at start={params.get('start')}: {error}")
+    if payload is None:
+        payload = resp.json()
+    if cache:
+        cache.misses += 1
+    # Only keep real pages; an error payload must not be served as fresh on the next run
+    if cache and parse_api_payload(payload)[0]:
+        cache.store(key, ajax_url, params, method, resp.content,
+                    etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'))
+    return payload
+
+
+def fetch_api_page(session, ajax_url, start, length, draw=1, retries=3, extra_params=None, method='GET'):
+    """Fetch `length` records from record offset `start` and return their normalized rows.
+    extra_params (e.g. API_ORDER_PARAMS) are sent with the request.
+    A page shorter than `length` that ends before recordsFiltered counts as a failure, like an
+    error payload, so only the real end of the data comes back short.
+    Retries transient failures and raises the last error if every attempt fails.
+    """
+    params = {
+        'start': start,
+        'length': length,
+        'draw': draw
+    }
+    if extra_params:
+        params.update(extra_params)
+    last_err = None
+    for attempt in range(retries):
+        try:
+            data, total = parse_api_payload(api_request(session, ajax_url, params, method=method))
+            if total is not None and len(data) < length and start + len(data) < total:
+                raise DataTablesError(f"short page at start={start}: {len(data)} of {length} rows, "
+                                      f"recordsFiltered {total} (is the page length above the server's limit?)")
+            return normalize_api_rows(data)
+        except Exception as e:
+            last_err = e
+            if attempt < retries - 1:
+                METRICS.inc('api_retries_total')
+                time.sleep(1 + attempt)
+    raise last_err
+
+
+def negotiate_page_length(ajax_url, session, candidates=PAGE_LENGTH_CANDIDATES, timeout=60, extra_params=None, method='GET'):
+    """Find the largest DataTables `length` the endpoint honours.
+    Probes increasing sizes from offset 0 and compares the returned row count with recordsTotal.
+    Stops at the first size the server caps (using the capped count) or fails on.
+    """
+    best = DISPLAY_PAGE_LENGTH
+    for length in candidates:
+        if length <= best:
+            continue
+        try:
+            t0 = time.time()
+            params = dict(extra_params or {}, start=0, length=length, draw=1)
+            data, total = parse_api_payload(api_request(session, ajax_url, params, method=method, timeout=timeout))
         except Exception as e:
-            print(f"API scraping error on page {page}: {e}")
+            print(f"Page length probe {length} failed ({e}); keeping {best}")
             break
+        got = len(data)
+        expected = min(length, total) if total is not None else length
+        print(f"Page length probe {length}: {got} rows in {time.time() - t0:.2f}s (recordsTotal {total})")
+        if got < expected:
+            # Server caps the page size; use whatever it actually returned
+            best = max(best, got)
+            break
+        best = length
+        if total is not None and length >= total:
+            break
+    print(f"Using API page length {best}")
+    return best
+
+
+def api_scrape(ajax_url, start_page, end_page, csv_checkpoint, cookies=None, headers=None, page_length=10, workers=1, session=None, start_offset=None, extra_params=None, method='GET', store=None, delta=False):
+    """Scrape pages via the DataTables server-side AJAX endpoint and append rows to CSV checkpoint
+    (or to `store`, see open_store).
+    start_page/end_page are site pages of DISPLAY_PAGE_LENGTH rows. Requests are issued in chunks
+    of `page_length` records starting at `start_offset` (defaults to the first row of start_page).
+    extra_params (e.g. API_ORDER_PARAMS) are sent with every request, using HTTP `method`.
+    Up to `workers` requests are kept in flight; results are written in order.
+    `session` is the shared HTTP session for the run; one is created if not given.
+    With delta=True only new or changed rows are written, and scraping stops at the first
+    page whose rows are all already in the store (pass DELTA_ORDER_PARAMS as extra_params).
+    Returns total rows scraped.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = max(1, int(workers or 1))
+    page_length = max(1, int(page_length or DISPLAY_PAGE_LENGTH))
+    if session is None:
+        s = make_http_session(cookies=cookies, headers=headers, pool_size=max(10, workers))
+    else:
+        s = update_http_session(session, cookies=cookies, headers=headers)
+    controller = getattr(s, 'controller', None)
+
+    own_store = store is None
+    if own_store:
+        store = CsvCheckpoint(csv_checkpoint)
+    if start_offset is None:
+        start_offset = (start_page - 1) * DISPLAY_PAGE_LENGTH
+    end_offset = end_page * DISPLAY_PAGE_LENGTH
+    chunks = [(off, min(page_length, end_offset - off)) for off in range(start_offset, end_offset, page_length)]
+    METRICS.set('rows_target', max(0, end_offset - start_offset))
 
+    total_rows = 0
+    failed = []
+    in_flight = {}
+    next_submit = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        idx = 0
+        while idx < len(chunks):
+            # Keep the window of in-flight requests full
+            while next_submit < len(chunks) and len(in_flight) < workers:
+                off, length = chunks[next_submit]
+                in_flight[next_submit] = pool.submit(fetch_api_page, s, ajax_url, off, length, next_submit + 1, extra_params=extra_params, method=method)
+                next_submit += 1
+
+            off, length = chunks[idx]
+            page = off // DISPLAY_PAGE_LENGTH + 1
+            future = in_flight.pop(idx)
+            try:
+                page_rows = future.result()
+            except Exception as e:
+                # Record the failure and keep going with the remaining chunks
+                print(f"API scraping error at offset {off} (page {page}): {e}")
+                failed.append(off)
+                log_skipped_page(page, f"api: {e}", offset=off, length=length)
+                idx += 1
+                continue
+
+            if not page_rows:
+                print(f"No data returned at offset {off} (page {page})")
+                break
+
+            fetched = len(page_rows)
+            if delta:
+                page_rows = [r for r in page_rows if store.row_state(r) != 'known']
+                if not page_rows:
+                    print(f"Delta: offset {off} (page {page}) has only known records; stopping")
+                    break
+
+            if delta:
+                # Newest-first positions must not become the resume point or row provenance
+                store.write_delta(page_rows)
+            else:
+                store.write_page(page_rows, page=(off + len(page_rows) - 1) // DISPLAY_PAGE_LENGTH + 1,
+                                 offset=off, endpoint=ajax_url, page_length=page_length, order=order_label(extra_params))
+            total_rows += len(page_rows)
+            pacing = f" [{controller.describe()}]" if controller else ""
+            log(f"API scraped offset {off} (page {page}): {len(page_rows)} rows (total {total_rows}){pacing}", 'debug')
+
+            # If fewer than requested returned, probably last page
+            if fetched < length:
+                break
+            idx += 1
+
+        # Drop any requests issued past the end of the data
+        for f in in_flight.values():
+            f.cancel()
+
+    # Commit the last group so callers reading the checkpoint see every row
+    if own_store:
+        store.close()
+    else:
+        store.commit()
+    if failed:
+        print(f"API scraping finished with {len(failed)} failed request(s) at offsets: {failed}")
     return total_rows
 
 
-def api_get_page(ajax_url, page, cookies=None, headers=None, page_length=10):
-    """Return the raw data array for a given 1-based page from the DataTables ajax endpoint."""
-    s = requests.Session()
-    if headers:
-        s.headers.update(headers)
-    if cookies:
-        for c in cookies:
-            s.cookies.set(c['name'], c.get('value',''))
+def api_get_page(ajax_url, page, cookies=None, headers=None, page_length=10, session=None):
+    """Return the raw data array for a given 1-based page from the DataTables ajax endpoint.
+    Goes through api_request, so the session's response cache and rate controller apply.
+    """
+    if session is None:
+        s = make_http_session(cookies=cookies, headers=headers)
+    else:
+        s = update_http_session(session, cookies=cookies, headers=headers)
 
     start = (page - 1) * page_length
     params = {'start': start, 'length': page_length, 'draw': page}
-    resp = s.get(ajax_url, params=params, timeout=30)
-    resp.raise_for_status()
-    j = resp.json()
-    if isinstance(j, dict):
-        return j.get('data') or j.get('aaData') or []
-    if isinstance(j, list):
-        return j
-    return []
+    return parse_api_payload(api_request(s, ajax_url, params))[0]
+
+
+def _resume_key(value):
+    """Comparison key for Reg No ordering (server collation is case-insensitive)."""
+    return str(value if value is not None else '').strip().casefold()
+
+
+@METRICS.timer('resume_detection_seconds', method='api_search')
+def find_resume_offset_via_api(last_identifier, ajax_url, session, id_index=REG_NO_INDEX, probe_length=DISPLAY_PAGE_LENGTH, extra_params=API_ORDER_PARAMS, method='GET'):
+    """Locate the record offset just after `last_identifier` in the server's Reg No ordering.
+    Gallops forward from offset 0 in doubling steps, then binary searches the bracket, so it
+    costs O(log n) requests. Because the result is the insertion point of the key, it stays
+    correct if the record was deleted or other records were inserted since the checkpoint.
+    Returns (offset, found_exact), or (None, False) if the server does not honour the ordering.
+    """
+    target = _resume_key(last_identifier)
+    probes = [0]
+    seen = [False]
+
+    def keys_at(offset):
+        probes[0] += 1
+        rows = fetch_api_page(session, ajax_url, offset, probe_length, draw=probes[0], extra_params=extra_params, method=method)
+        keys = [_resume_key(r[id_index]) if len(r) > id_index else '' for r in rows]
+        if any(a > b for a, b in zip(keys, keys[1:])):
+            raise ValueError("server did not return rows in the requested order")
+        return keys
+
+    def split(offset, keys):
+        """Return (boundary offset or None, direction) for one probed window."""
+        if target in keys:
+            seen[0] = True
+        le = sum(1 for k in keys if k <= target)
+        if not keys:
+            return None, -1
+        if le == 0:
+            return (offset, 0) if offset == 0 else (None, -1)
+        if le < len(keys) or len(keys) < probe_length:
+            return offset + le, 0
+        return None, 1
+
+    try:
+        # Gallop: 0, L, 2L, 4L, ... until the window passes the target
+        lo, hi = 0, None
+        step = probe_length
+        offset = 0
+        while True:
+            keys = keys_at(offset)
+            found, direction = split(offset, keys)
+            if found is not None:
+                print(f"Resume offset {found} located in {probes[0]} request(s)")
+                return found, seen[0]
+            if direction < 0:
+                hi = offset
+                break
+            lo = offset + probe_length
+            offset += step
+            step *= 2
+
+        # Binary search within [lo, hi): every record before lo sorts <= target
+        while lo < hi:
+            mid = (lo + hi) // 2
+            keys = keys_at(mid)
+            found, direction = split(mid, keys)
+            if found is not None:
+                print(f"Resume offset {found} located in {probes[0]} request(s)")
+                return found, seen[0]
+            if direction < 0:
+                hi = mid
+            else:
+                lo = mid + probe_length
+        print(f"Resume offset {lo} located in {probes[0]} request(s)")
+        return lo, seen[0]
+    except Exception as e:
+        print(f"Ordered resume search failed: {e}")
+        return None, False
 
 
-def find_resume_page_via_api(last_identifier, ajax_url, est_page, cookies=None, headers=None, page_length=10, id_index=4, max_scan=50):
+@METRICS.timer('resume_detection_seconds', method='api_scan')
+def find_resume_page_via_api(last_identifier, ajax_url, est_page, cookies=None, headers=None, page_length=10, id_index=REG_NO_INDEX, max_scan=50, session=None):
     """Scan nearby pages (starting at est_page) to find the page that contains last_identifier.
     Returns the page number that contains it, or est_page if not found.
     id_index: column index in returned row data that contains the unique identifier (NAFDAC Reg No)
     max_scan: how many pages to scan forward/backward before giving up
+    session: shared HTTP session reused for every probe
     """
+    if session is None:
+        session = make_http_session(cookies=cookies, headers=headers)
+    else:
+        update_http_session(session, cookies=cookies, headers=headers)
     try:
         # First check estimated page
         pages_to_check = [est_page]
@@ -354,7 +1588,7 @@ def find_resume_page_via_api(last_identifier, ajax_url, est_page, cookies=None,
                 continue
             checked.add(p)
             try:
-                rows = api_get_page(ajax_url, p, cookies=cookies, headers=headers, page_length=page_length)
+                rows = api_get_page(ajax_url, p, page_length=page_length, session=session)
             except Exception:
                 continue
             for r in rows:
@@ -373,7 +1607,328 @@ def find_resume_page_via_api(last_identifier, ajax_url, est_page, cookies=None,
     except Exception:
         return est_page
 
-def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=True, driver_path=None, start_page=None, no_headless=False, debug=False, force_api=False, csv_only=False):
+def fill_gaps(output_file="nafdac_greenbook.xlsx", store="csv", skip_log="skipped_pages.log", workers=4, ajax_url=None, csv_only=False, rate_control=True, max_rate=50.0, cache_dir=".http_cache", cache_ttl=86400, base_url=None, endpoint_cache=ENDPOINT_CACHE_FILE, endpoint_ttl=ENDPOINT_TTL):
+    """Re-fetch only the pages recorded in the skip log and merge them into the checkpoint.
+    API entries (offset/length) are requested again in the Reg No order they were scraped in;
+    browser entries (page only) as that page of the site's default order. Gaps the store's
+    provenance already covers (SQLite offsets) are resolved without a request. Filled rows go
+    back to their original position, and their log entries are marked resolved.
+    Returns the number of rows added.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    base_url = base_url or BASE_URL
+
+    entries = [e for e in read_skip_log(skip_log) if not e['resolved'] and e['page']]
+    if not entries:
+        print(f"No unresolved pages in {skip_log}")
+        return 0
+
+    # One gap per distinct range; a page that failed on several runs is logged several times
+    gaps = {}
+    for e in entries:
+        if e['offset'] is not None:
+            key = (e['offset'], e['length'] or DISPLAY_PAGE_LENGTH, True)
+        else:
+            key = ((e['page'] - 1) * DISPLAY_PAGE_LENGTH, DISPLAY_PAGE_LENGTH, False)
+        gaps.setdefault(key, []).append(e)
+
+    sink = open_store(store, output_file)
+    resolved = []
+    for key in [k for k in gaps if sink.covers(k[0], k[1])]:
+        print(f"Gap at offset {key[0]} is already in the store")
+        resolved.extend(gaps.pop(key))
+
+    summary = sink.summary() or {}
+    ajax_url = ajax_url or summary.get('endpoint')
+    # API gaps are re-requested in the order the checkpoint was written in (Reg No if unrecorded)
+    gap_order = order_params(summary.get('order') or order_label(API_ORDER_PARAMS))
+    controller = make_rate_controller(max_rate, workers) if rate_control else None
+    http = make_http_session(headers={'User-Agent': 'Mozilla/5.0', 'Referer': base_url},
+                             pool_size=max(10, workers), controller=controller,
+                             cache=make_response_cache(cache_dir, ttl=cache_ttl))
+    if gaps and not ajax_url:
+        entry = discover_endpoint(http, base_url, endpoint_cache, endpoint_ttl)
+        ajax_url = entry['url'] if entry else None
+    if gaps and not ajax_url:
+        print("No API endpoint recorded in the checkpoint or found on the site; cannot fill gaps")
+        mark_skips_resolved(skip_log, resolved)
+        sink.close()
+        return 0
+
+    # CSV row k sits at source offset k + (rows missing before it), so each gap goes back
+    # after (its offset - rows of earlier gaps) checkpoint rows
+    ordered = sorted(gaps)
+    positions = {}
+    missing = 0
+    for key in ordered:
+        positions[key] = key[0] - missing
+        missing += key[1]
+    if ordered:
+        print(f"Filling {len(ordered)} gap(s) ({missing} rows) from {ajax_url} with {workers} worker(s)")
+
+    fills = []
+    with ThreadPoolExecutor(max_workers=max(1, int(workers or 1))) as pool:
+        futures = {key: pool.submit(fetch_api_page, http, ajax_url, key[0], key[1], i + 1,
+                                    extra_params=gap_order if key[2] else None)
+                   for i, key in enumerate(ordered)}
+        for key in ordered:
+            off = key[0]
+            page = off // DISPLAY_PAGE_LENGTH + 1
+            try:
+                rows = futures[key].result()
+            except Exception as e:
+                print(f"Gap at offset {off} (page {page}) still failing: {e}")
+                continue
+            if not rows:
+                print(f"Gap at offset {off} (page {page}) returned no rows")
+                continue
+            fills.append({'position': positions[key], 'offset': off, 'page': page, 'rows': rows})
+            resolved.extend(gaps[key])
+            log(f"Fetched gap at offset {off} (page {page}): {len(rows)} rows", 'debug')
+
+    added = sink.insert_gap_rows(fills) if fills else 0
+    mark_skips_resolved(skip_log, resolved)
+    print(f"Filled {len(fills)} of {len(ordered)} gap(s): {added} rows added, {len(resolved)} log entries resolved")
+    if added:
+        if sink.kind != 'csv':
+            export_store(sink, output_file, csv_only=csv_only)
+        elif not csv_only:
+            csv_to_excel_stream(os.path.splitext(output_file)[0] + ".csv", output_file)
+    sink.close()
+    return added
+
+
+def rebuild_from_cache(output_file="nafdac_greenbook.xlsx", store="csv", cache_dir=".http_cache", csv_only=False, ajax_url=None, skip_log="skipped_pages.log"):
+    """Offline mode: rebuild the checkpoint and its exports from cached API pages, with no network access.
+    Cached pages in the full-scrape ordering (API_ORDER_PARAMS) are laid out by offset; overlapping
+    pages are de-duplicated and ranges no page covers are written to the skip log for --fill-gaps.
+    Returns the number of rows written.
+    """
+    import json
+    cache = make_response_cache(cache_dir, offline=True)
+    if cache is None:
+        print("Offline mode needs the response cache (--cache-dir)")
+        return 0
+    endpoints = cache.endpoints()
+    csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
+    ajax_url = ajax_url or (load_checkpoint_summary(csv_checkpoint, rebuild=False) or {}).get('endpoint') or (endpoints[0] if endpoints else None)
+    if not ajax_url:
+        print(f"No cached API pages in {cache_dir}")
+        cache.close()
+        return 0
+
+    wanted = {k: str(v) for k, v in API_ORDER_PARAMS.items()}
+    pages = []
+    for _, _, params, body in cache.entries(ajax_url):
+        if any(str(params.get(k)) != v for k, v in wanted.items()) or params.get('search[value]'):
+            continue  # another ordering or a filtered view
+        try:
+            start = int(params.get('start', 0))
+            data, _ = parse_api_payload(json.loads(body))
+        except Exception:
+            continue
+        if data:
+            pages.append((start, normalize_api_rows(data)))
+    pages.sort(key=lambda p: p[0])
+    print(f"Offline: rebuilding from {len(pages)} cached pages of {ajax_url}")
+
+    if store == 'csv':
+        # Build a fresh checkpoint beside the old one and swap it in when complete
+        target = CsvCheckpoint(os.path.splitext(output_file)[0] + ".offline.csv")
+        if os.path.exists(target.csv_path):
+            os.remove(target.csv_path)
+        if os.path.exists(manifest_path(target.csv_path)):
+            os.remove(manifest_path(target.csv_path))
+    else:
+        target = open_store(store, output_file)
+
+    next_offset = 0
+    written = 0
+    for start, page_rows in pages:
+        if start > next_offset:
+            print(f"Offline: offsets {next_offset}-{start - 1} are not cached")
+            log_skipped_page(next_offset // DISPLAY_PAGE_LENGTH + 1, "offline: not cached", log_path=skip_log,
+                             offset=next_offset, length=start - next_offset)
+        fresh = page_rows[max(0, next_offset - start):]
+        if fresh:
+            first = max(start, next_offset)
+            target.write_page(fresh, page=(first + len(fresh) - 1) // DISPLAY_PAGE_LENGTH + 1, offset=first,
+                              endpoint=ajax_url, page_length=len(page_rows), order=order_label(API_ORDER_PARAMS))
+            written += len(fresh)
+        next_offset = max(next_offset, start + len(page_rows))
+    target.close()
+    cache.close()
+
+    if store == 'csv':
+        os.replace(target.csv_path, csv_checkpoint)
+        os.replace(manifest_path(target.csv_path), manifest_path(csv_checkpoint))
+        print(f"Offline: wrote {written} rows to {csv_checkpoint}")
+        if not csv_only:
+            csv_to_excel_stream(csv_checkpoint, output_file)
+    else:
+        export_store(open_store(store, output_file), output_file, csv_only=csv_only)
+    return written
+
+
+def read_checkpoint_state(sink, output_file):
+    """Return (row count, last Reg No) of the checkpoint, reading only the manifest when possible."""
+    summary = sink.summary()
+    if summary is not None:
+        print(f"Checkpoint manifest: {summary.get('rows', 0)} rows, last Reg No {summary.get('last_reg_no')}")
+        return summary.get('rows', 0), summary.get('last_reg_no')
+    csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
+    if not any(os.path.exists(p) for p in (csv_checkpoint, manifest_path(csv_checkpoint), output_file)):
+        # Fresh run: nothing to resume from
+        return 0, None
+    # No CSV checkpoint: fall back to the Excel file
+    data, _ = load_existing_data(output_file)
+    last = data[-1] if data else None
+    return len(data), (last[REG_NO_INDEX] if last and len(last) > REG_NO_INDEX else None)
+
+
+def scrape_endpoint(ajax_url, sink, http, output_file, end_page=876, start_page=None, resume=True, page_length=None, workers=1, delta=False, csv_only=False, base_params=None, method='GET', endpoint=None):
+    """Scrape through the API endpoint into `sink` using session `http`, resuming at the exact
+    checkpoint row offset. base_params/method replay a captured browser request (see
+    read_datatables_xhr). With an `endpoint` entry (see discover_endpoint) its max_length is
+    used instead of negotiating, and a newly negotiated length is stored in it.
+    Returns the number of rows written.
+    """
+    params = dict(base_params or {})
+    params.update(DELTA_ORDER_PARAMS if delta else API_ORDER_PARAMS)
+    csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
+    if delta:
+        # Newest approvals first from the top; api_scrape stops at the first fully known page
+        print("Delta sync: fetching newest approvals until a page has no new or changed records")
+        scraped = api_scrape(ajax_url, 1, end_page, csv_checkpoint, page_length=page_length or DELTA_PAGE_LENGTH,
+                             workers=1, session=http, extra_params=params, method=method, store=sink, delta=True)
+        print(f"Delta sync finished, {scraped} new or changed rows written")
+        if sink.kind != 'csv' and scraped:
+            export_store(sink, output_file, csv_only=csv_only)
+        return scraped
+    rows_done, last_identifier = read_checkpoint_state(sink, output_file)
+    api_order = order_label(API_ORDER_PARAMS)
+    # Checkpoints without a recorded order come from the browser loop or older API runs,
+    # which paged in the site's default order
+    recorded = ((sink.summary() or {}).get('order') or 'default') if rows_done else api_order
+    if recorded != api_order:
+        # Offsets only line up in the order the checkpoint was written in; keep paging in it
+        params = dict(base_params or {})
+        params.update(order_params(recorded))
+        print(f"Checkpoint rows are in {recorded} order, not Reg No order; continuing in that order")
+    start_offset = None
+    if start_page:
+        api_start = int(start_page)
+    elif resume and rows_done and recorded != api_order:
+        # The Reg No search does not apply; check the row before the resume offset is the last one saved
+        api_start = (rows_done // DISPLAY_PAGE_LENGTH) + 1
+        start_offset = rows_done
+        if last_identifier:
+            try:
+                prev = fetch_api_page(http, ajax_url, rows_done - 1, 1, extra_params=params, method=method)
+            except Exception as e:
+                prev = None
+                print(f"Could not verify the resume offset ({e}); resuming at offset {rows_done}")
+            if prev and (len(prev[0]) <= REG_NO_INDEX or str(prev[0][REG_NO_INDEX]).strip() != str(last_identifier).strip()):
+                print(f"Refusing to resume: the site's row {rows_done} is no longer {last_identifier}, so the {recorded} "
+                      f"order has shifted since the checkpoint was written and resuming would duplicate or miss records. "
+                      f"Start a new checkpoint (or re-scrape with --start 1 --store sqlite, which upserts on Reg No).")
+                return 0
+    elif resume and rows_done:
+        api_start = (rows_done // DISPLAY_PAGE_LENGTH) + 1
+        start_offset = rows_done
+        if last_identifier:
+            found, exact = find_resume_offset_via_api(last_identifier, ajax_url, http, extra_params=params, method=method)
+            if found is not None:
+                start_offset = found
+                api_start = found // DISPLAY_PAGE_LENGTH + 1
+                if not exact:
+                    print(f"Last identifier {last_identifier} is no longer on the server; resuming at its sort position")
+    else:
+        api_start = 1
+    length = page_length or (endpoint or {}).get('max_length')
+    if not length:
+        length = negotiate_page_length(ajax_url, http, extra_params=params, method=method)
+        if endpoint is not None:
+            endpoint['max_length'] = length
+    print(f"API mode starting from page {api_start} (offset {start_offset if start_offset is not None else (api_start - 1) * DISPLAY_PAGE_LENGTH}, length {length})")
+    scraped = api_scrape(ajax_url, api_start, end_page, csv_checkpoint, page_length=length, workers=workers, session=http, start_offset=start_offset, extra_params=params, method=method, store=sink)
+    print(f"API-mode scraping finished, {scraped} rows written to {csv_checkpoint if sink.kind == 'csv' else sink.db_path}")
+    if sink.kind != 'csv':
+        export_store(sink, output_file, csv_only=csv_only)
+    return scraped
+
+
+def scrape_api(output_file="nafdac_greenbook.xlsx", end_page=876, resume=True, start_page=None, csv_only=False, workers=1, page_length=None, store="csv", delta=False, commit_pages=10, commit_seconds=5.0, fsync=False, rate_control=True, max_rate=50.0, cache_dir=".http_cache", cache_ttl=86400, cache_max_mb=500, base_url=None, ajax_url=None, endpoint_cache=ENDPOINT_CACHE_FILE, endpoint_ttl=ENDPOINT_TTL, discover=True):
+    """Scrape over HTTP only: page through the cached DataTables endpoint, or the one found in
+    the site HTML (not searched with discover=False), or `ajax_url` (e.g. the endpoint recorded
+    in the checkpoint). Never imports selenium.
+    Returns the number of rows written, or None if no endpoint could be found.
+    """
+    base_url = base_url or BASE_URL
+    controller = make_rate_controller(max_rate, workers) if rate_control else None
+    cache = make_response_cache(cache_dir, ttl=0 if delta else cache_ttl, max_mb=cache_max_mb)
+    http = make_http_session(headers={'User-Agent': 'Mozilla/5.0', 'Referer': base_url},
+                             pool_size=max(10, workers, controller.max_concurrency if controller else 0),
+                             controller=controller, cache=cache)
+    try:
+        entry = None
+        if ajax_url:
+            cached = load_endpoint(base_url, endpoint_cache, endpoint_ttl)
+            if cached and cached['url'] == ajax_url:
+                entry = cached
+                update_http_session(http, cookies=entry.get('cookies'), headers=entry.get('headers'))
+        else:
+            entry = discover_endpoint(http, base_url, endpoint_cache, endpoint_ttl, discover=discover)
+            if not entry:
+                return None
+            ajax_url = entry['url']
+        known_length = (entry or {}).get('max_length')
+        sink = open_store(store, output_file, commit_pages=commit_pages, commit_seconds=commit_seconds, fsync=fsync)
+        try:
+            return scrape_endpoint(ajax_url, sink, http, output_file, end_page=end_page, start_page=start_page,
+                                   resume=resume, page_length=page_length, workers=workers, delta=delta, csv_only=csv_only,
+                                   base_params=(entry or {}).get('params'), method=(entry or {}).get('method', 'GET'),
+                                   endpoint=entry)
+        finally:
+            sink.close()
+            if entry and entry.get('max_length') != known_length:
+                save_endpoint(base_url, entry, endpoint_cache)
+    finally:
+        if cache:
+            print(cache.describe())
+            cache.close()
+
+
+def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=True, driver_path=None, start_page=None, no_headless=False, debug=False, force_api=False, csv_only=False, workers=1, page_length=None, fast_nav=False, nav_timeout=10, browser_only=False, skip_log="skipped_pages.log", lean_browser=False, capture_xhr=False, store="csv", delta=False, commit_pages=10, commit_seconds=5.0, fsync=False, rate_control=True, max_rate=50.0, cache_dir=".http_cache", cache_ttl=86400, cache_max_mb=500, base_url=None, endpoint_cache=ENDPOINT_CACHE_FILE, endpoint_ttl=ENDPOINT_TTL):
+    base_url = base_url or BASE_URL
+    # With a cached endpoint (or --force-api) try the HTTP-only scraper first; it never starts
+    # Selenium (this also avoids webdriver_manager probing the local browser). Only --force-api
+    # searches the site HTML when the cached endpoint is missing or fails its probe.
+    if force_api or (not browser_only and load_endpoint(base_url, endpoint_cache, endpoint_ttl)):
+        try:
+            scraped = scrape_api(output_file=output_file, end_page=end_page, resume=resume, start_page=start_page,
+                                 csv_only=csv_only, workers=workers, page_length=page_length, store=store, delta=delta,
+                                 commit_pages=commit_pages, commit_seconds=commit_seconds, fsync=fsync,
+                                 rate_control=rate_control, max_rate=max_rate, cache_dir=cache_dir,
+                                 cache_ttl=cache_ttl, cache_max_mb=cache_max_mb, base_url=base_url,
+                                 endpoint_cache=endpoint_cache, endpoint_ttl=endpoint_ttl, discover=force_api)
+            if scraped is not None:
+                return
+            if force_api:
+                print("--force-api requested but could not detect ajax endpoint from HTML; falling back to Selenium")
+        except Exception as e:
+            print(f"HTTP-only early path failed: {e}; continuing with Selenium")
+
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.alert import Alert
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import UnexpectedAlertPresentException, NoAlertPresentException, InvalidSessionIdException
+    import traceback
+
     # Setup Chrome options
     options = webdriver.ChromeOptions()
     if not no_headless:
@@ -381,16 +1936,31 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--window-size=1920,1080")  # Larger window for better rendering
+    if lean_browser:
+        apply_lean_profile(options)
+    if capture_xhr:
+        enable_network_capture(options)
+
+    # Adaptive pacing shared by the HTTP paths (through the session) and the browser page turns
+    controller = make_rate_controller(max_rate, workers) if rate_control else None
+    # Cached API pages; delta sync always revalidates, since it is looking for new records
+    cache = make_response_cache(cache_dir, ttl=0 if delta else cache_ttl, max_mb=cache_max_mb)
+    # One pooled HTTP session shared by endpoint discovery, paging and resume probes
+    http = make_http_session(headers={'User-Agent': 'Mozilla/5.0', 'Referer': base_url},
+                             pool_size=max(10, workers, controller.max_concurrency if controller else 0),
+                             controller=controller, cache=cache)
+    # Checkpoint store shared by the API and browser paths
+    sink = open_store(store, output_file, commit_pages=commit_pages, commit_seconds=commit_seconds, fsync=fsync)
     
     def init_driver():
         """Initialize and return a Chrome webdriver instance (retries on failures)."""
         last_err = None
         for attempt in range(3):
             try:
-                if driver_path:
-                    d = webdriver.Chrome(service=Service(driver_path), options=options)
-                else:
-                    d = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+                with METRICS.timer('driver_init_seconds'):
+                    d = webdriver.Chrome(service=Service(driver_path or resolve_chromedriver()), options=options)
+                if lean_browser:
+                    block_nonessential_requests(d)
                 return d
             except Exception as e:
                 last_err = e
@@ -398,39 +1968,42 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                 time.sleep(2)
         raise Exception(f"Could not initialize Chrome driver: {last_err}")
 
-    # If user requested force-api, try to detect the AJAX endpoint from the HTML and run the API scraper
-    # without initializing Selenium (this avoids webdriver_manager probing the local browser).
-    if force_api:
-        try:
-            csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
-            # Determine start page from existing checkpoint or provided start_page
-            data, last_page = load_existing_data(output_file)
-            if start_page:
-                page = int(start_page)
-            else:
-                page = last_page if resume else 1
-            print(f"(force-api) starting from page {page}")
+    def checkpoint_state():
+        return read_checkpoint_state(sink, output_file)
 
-            main_html = None
-            try:
-                main_html = requests.get('https://greenbook.nafdac.gov.ng/', timeout=20).text
-            except Exception as rexc:
-                print(f"Failed to fetch main page for force-api detection: {rexc}")
-
-            force_ajax = None
-            if main_html:
-                force_ajax = detect_ajax_from_html(main_html, base_url='https://greenbook.nafdac.gov.ng/')
-
-            if force_ajax:
-                print(f"Force-API detected ajax endpoint from HTML: {force_ajax}")
-                headers = {'User-Agent': 'Mozilla/5.0', 'Referer': 'https://greenbook.nafdac.gov.ng/'}
-                scraped = api_scrape(force_ajax, page, end_page, csv_checkpoint, headers=headers)
-                print(f"Force-API scraping finished, {scraped} rows appended to {csv_checkpoint}")
-                return
-            else:
-                print("--force-api requested but could not detect ajax endpoint from HTML; falling back to Selenium")
-        except Exception as e:
-            print(f"Force-API early path failed: {e}; continuing with Selenium")
+    def run_api_mode(entry):
+        """Cache the endpoint the browser found, then scrape it over HTTP."""
+        save_endpoint(base_url, entry, endpoint_cache)
+        try:
+            return scrape_endpoint(entry['url'], sink, http, output_file, end_page=end_page, start_page=start_page,
+                                   resume=resume, page_length=page_length, workers=workers, delta=delta,
+                                   csv_only=csv_only, base_params=entry['params'], method=entry['method'],
+                                   endpoint=entry)
+        finally:
+            save_endpoint(base_url, entry, endpoint_cache)
+
+    def pause(seconds):
+        """Fixed settle delay; skipped in fast navigation mode, where redraw waits replace it."""
+        if fast_nav:
+            NAV_WAIT_STATS['budget'] += seconds
+        else:
+            METRICS.inc('navigation_sleep_seconds_total', seconds)
+            time.sleep(seconds)
+
+    def draw_marker():
+        """Draw counter to pass to await_redraw (None unless fast navigation is on)."""
+        return table_draw_count(driver) if fast_nav else None
+
+    def await_redraw(prev_draw, seconds):
+        """Wait for the table to redraw after a page turn.
+        In fast mode this returns as soon as draw.dt fires (bounded by nav_timeout);
+        otherwise, or if the draw hook is unavailable, it sleeps the fixed `seconds`.
+        """
+        if fast_nav and prev_draw is not None:
+            wait_for_table_draw(driver, prev_draw, timeout=nav_timeout, budget=seconds)
+        else:
+            METRICS.inc('navigation_sleep_seconds_total', seconds)
+            time.sleep(seconds)
 
     # Initialize driver
     driver = init_driver()
@@ -438,13 +2011,14 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
     try:
         # Load the page
         print("Loading page...")
-        driver.get("https://greenbook.nafdac.gov.ng/")
+        driver.get(base_url)
         
         # Wait for table to load
         wait = WebDriverWait(driver, 20)
         print("Waiting for table to appear...")
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable")))
-        time.sleep(2)  # Allow table to fully render
+        pause(2)  # Allow table to fully render
+        draw_marker()  # install the redraw hook early in fast mode
 
         # If debug mode is on, dump DataTables info to help debugging JS API issues
         if debug:
@@ -469,51 +2043,52 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
 
         # Detect if DataTables is server-side and has an AJAX endpoint. If so, prefer API scraping.
         try:
-            ajax_url, dt_info = detect_datatables_ajax(driver)
+            ajax_url, dt_info = detect_datatables_ajax(driver) if not browser_only else (None, None)
             if ajax_url and dt_info and dt_info.get('serverSide'):
                 print(f"Detected DataTables server-side ajax: {ajax_url} (info: {dt_info})")
-                # Prepare headers/cookies for requests
-                headers = {'User-Agent': 'Mozilla/5.0', 'Referer': driver.current_url}
-                cookies = driver.get_cookies()
-                csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
-                scraped = api_scrape(ajax_url, page, end_page, csv_checkpoint, cookies=cookies, headers=headers, page_length=dt_info.get('length',10))
-                print(f"API-mode scraping finished, {scraped} rows appended to {csv_checkpoint}")
+                # Share the browser's cookies with the HTTP session
+                update_http_session(http, cookies=driver.get_cookies(), headers={'Referer': driver.current_url})
+                run_api_mode(endpoint_entry(ajax_url, headers={'Referer': driver.current_url}, cookies=driver.get_cookies(),
+                                            columns=table_columns_from_html(driver.page_source), source='browser'))
                 # Close the browser and exit early since we've completed via API
                 driver.quit()
                 return
         except Exception as e:
             print(f"API detection/scrape skipped due to error: {e}")
 
-        # If user requested force-api, attempt to detect AJAX endpoint from HTML and run api_scrape without Selenium
-        if force_api:
+        # Replay the DataTables request the browser actually made (captured from the network log)
+        if capture_xhr and not browser_only:
             try:
-                main_html = None
-                try:
-                    main_html = requests.get('https://greenbook.nafdac.gov.ng/', timeout=20).text
-                except Exception as rexc:
-                    print(f"Failed to fetch main page for API-detection: {rexc}")
-
-                force_ajax = None
-                if main_html:
-                    force_ajax = detect_ajax_from_html(main_html, base_url='https://greenbook.nafdac.gov.ng/')
-
-                if force_ajax:
-                    print(f"Force-API detected ajax endpoint: {force_ajax}")
-                    csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
-                    scraped = api_scrape(force_ajax, page, end_page, csv_checkpoint, headers={'User-Agent':'Mozilla/5.0','Referer':'https://greenbook.nafdac.gov.ng/'})
-                    print(f"Force-API scraping finished, {scraped} rows appended to {csv_checkpoint}")
-                    try:
-                        driver.quit()
-                    except:
-                        pass
+                captured = read_datatables_xhr(driver)
+                if captured:
+                    xhr_url, xhr_params = replay_params_from_xhr(captured[-1])
+                    print(f"Captured DataTables XHR: {captured[-1]['method']} {xhr_url}; replaying over HTTP")
+                    update_http_session(http, cookies=driver.get_cookies(), headers={'Referer': driver.current_url})
+                    run_api_mode(endpoint_entry(xhr_url, method=captured[-1]['method'], params=xhr_params,
+                                                headers={'Referer': driver.current_url}, cookies=driver.get_cookies(),
+                                                columns=table_columns_from_html(driver.page_source), source='xhr'))
+                    driver.quit()
                     return
-                else:
-                    print("--force-api requested but could not detect ajax endpoint from HTML; continuing with Selenium")
             except Exception as e:
-                print(f"Force-API path failed: {e}")
-        
+                print(f"Captured XHR replay failed: {e}; continuing in the browser")
+
         # Load existing data and determine start page
-        data, last_page = load_existing_data(output_file)
+        rows_done, last_identifier = checkpoint_state()
+        last_page = (rows_done // DISPLAY_PAGE_LENGTH) + 1 if rows_done else 1
+        if delta:
+            # Re-sort the table newest approvals first and walk from page 1
+            col, direction = DELTA_ORDER_PARAMS['order[0][column]'], DELTA_ORDER_PARAMS['order[0][dir]']
+            prev_draw = draw_marker()
+            try:
+                driver.execute_script(
+                    "var t=document.querySelector('table.dataTable'); if(t && window.jQuery){ jQuery(t).DataTable().order([%d, '%s']).draw(); }" % (col, direction))
+            except Exception as e:
+                print(f"Could not sort table for delta sync: {e}")
+            await_redraw(prev_draw, 2)
+            start_page, resume = 1, False
+        # Rows scraped this run; the full checkpoint is only loaded for the final in-memory Excel save
+        data = RecordTable()
+        full_data_loaded = not rows_done
         if start_page:
             page = int(start_page)
             print(f"Starting from explicit start page {page}")
@@ -523,51 +2098,32 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
 
         # If we have existing data, try to locate the exact page that contains the last row
         # so we can resume from the next page instead of re-scraping pages or starting at 1.
-        if data:
-            last_row = data[-1]
-            last_identifier = None
-            try:
-                # Prefer NAFDAC Reg No column if present (index 4)
-                if len(last_row) > 4:
-                    last_identifier = last_row[4]
-                else:
-                    # fallback to last column
-                    last_identifier = last_row[-1]
-            except Exception:
-                last_identifier = None
-
+        if rows_done and not start_page:
             if last_identifier:
                 print(f"Last scraped identifier from checkpoint: {last_identifier}")
-                # Try to detect ajax endpoint for fast lookup
-                try:
-                    ajax_url2, dt_info2 = detect_datatables_ajax(driver)
-                except Exception:
-                    ajax_url2, dt_info2 = (None, None)
+                # Use the cached (or the browser's) ajax endpoint for a fast lookup
+                cached = load_endpoint(base_url, endpoint_cache, endpoint_ttl)
+                if cached:
+                    ajax_url2, dt_info2 = cached['url'], None
+                else:
+                    try:
+                        ajax_url2, dt_info2 = detect_datatables_ajax(driver)
+                    except Exception:
+                        ajax_url2, dt_info2 = (None, None)
 
                 if ajax_url2:
                     try:
                         est = page
-                        found_page = find_resume_page_via_api(last_identifier, ajax_url2, est_page=est, cookies=driver.get_cookies(), headers={'User-Agent':'Mozilla/5.0','Referer':driver.current_url}, page_length=(dt_info2.get('length',10) if dt_info2 else 10))
+                        found_page = find_resume_page_via_api(last_identifier, ajax_url2, est_page=est, cookies=driver.get_cookies(), headers={'Referer':driver.current_url}, page_length=(dt_info2.get('length',10) if dt_info2 else 10), session=http)
                         if found_page:
                             # resume from the page after the one containing last_identifier
                             page = found_page + 1
                             print(f"Detected last identifier on page {found_page} via API — resuming from {page}")
                     except Exception as e:
                         print(f"API resume detection failed: {e}")
-                elif force_api:
-                    # Attempt HTML detection if user explicitly requested force-api
-                    try:
-                        main_html = requests.get('https://greenbook.nafdac.gov.ng/', timeout=20).text
-                        force_ajax2 = detect_ajax_from_html(main_html, base_url='https://greenbook.nafdac.gov.ng/')
-                        if force_ajax2:
-                            est = page
-                            found_page = find_resume_page_via_api(last_identifier, force_ajax2, est_page=est, headers={'User-Agent':'Mozilla/5.0','Referer':'https://greenbook.nafdac.gov.ng/'}, page_length=10)
-                            page = found_page + 1
-                            print(f"Detected last identifier on page {found_page} via forced-API HTML detection — resuming from {page}")
-                    except Exception as e:
-                        print(f"Force-API resume detection failed: {e}")
                 else:
                     # Fall back to a Selenium-based localized search: jump to estimated page and verify
+                    resume_t0 = time.perf_counter()
                     try:
                         est = page
                         print(f"Attempting to verify last scraped identifier via Selenium starting at est page {est}")
@@ -586,15 +2142,9 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
 
                         def page_contains_identifier(idval):
                             try:
-                                rows = driver.find_elements(By.CSS_SELECTOR, "table.dataTable tbody tr")
-                                for r in rows:
-                                    try:
-                                        cells = r.find_elements(By.TAG_NAME, 'td')
-                                        vals = [c.text.strip() for c in cells]
-                                        if len(vals) > 4 and vals[4].strip() == str(idval).strip():
-                                            return True
-                                    except Exception:
-                                        continue
+                                for vals in extract_table_rows(driver):
+                                    if len(vals) > REG_NO_INDEX and vals[REG_NO_INDEX].strip() == str(idval).strip():
+                                        return True
                             except Exception:
                                 return False
                             return False
@@ -629,117 +2179,121 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                             print("Could not locate exact last identifier via Selenium — falling back to estimated page")
                     except Exception as e:
                         print(f"Selenium resume detection failed: {e}")
+                    METRICS.observe('resume_detection_seconds', time.perf_counter() - resume_t0, method='browser')
         
-        # Navigate to start page
-        if page > 1:
-            print(f"Navigating to page {page}...")
-            current_page = 1
-            
-            def handle_alerts():
-                try:
-                    alert = Alert(driver)
-                    alert.accept()
-                    print("Cleared alert during navigation")
-                    time.sleep(1)
-                except NoAlertPresentException:
-                    pass
+        # Page navigation helpers (also used by the scrape loop for recovery)
+        def handle_alerts():
+            try:
+                alert = Alert(driver)
+                alert.accept()
+                print("Cleared alert during navigation")
+                time.sleep(1)
+            except NoAlertPresentException:
+                pass
 
-            def safe_click_next():
+        def safe_click_next():
+            handle_alerts()
+            next_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "li.page-item.next:not(.disabled) a")))
+            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
+            pause(1)
+            prev_draw = draw_marker()
+            try:
+                driver.execute_script("arguments[0].click();", next_button)
+            except:
                 handle_alerts()
-                next_button = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "li.page-item.next:not(.disabled) a")))
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
-                time.sleep(1)
+                driver.execute_script("arguments[0].click();", next_button)
+            await_redraw(prev_draw, 2)  # Increased wait time after click
+            handle_alerts()
+
+        def go_to_page(target_page):
+            """Try to jump to `target_page` using the DataTables JS API. Returns True on success."""
+            for attempt in range(3):
                 try:
-                    driver.execute_script("arguments[0].click();", next_button)
-                except:
-                    handle_alerts()
-                    driver.execute_script("arguments[0].click();", next_button)
-                time.sleep(2)  # Increased wait time after click
-                handle_alerts()
+                    # Clear any alerts first
+                    try:
+                        Alert(driver).accept()
+                    except:
+                        pass
 
-            def go_to_page(target_page):
-                """Try to jump to `target_page` using the DataTables JS API. Returns True on success."""
-                for attempt in range(3):
+                    # Try to call DataTables API via JS. Use page index (0-based).
+                    js = ("(function(){"
+                          "var tblEl = document.querySelector('table.dataTable');"
+                          "if(!tblEl) return 'no-table';"
+                          "var dt = null;"
+                          "try{ dt = $(tblEl).DataTable(); }catch(e){}"
+                          "if(!dt){ try{ dt = $.fn.dataTable.Api(tblEl); }catch(e){} }"
+                          "if(!dt) return 'no-dt';"
+                          "try{ dt.page(%d).draw(false); return 'ok'; }catch(e){ return 'err'; }"
+                          "})();") % (target_page - 1)
+
+                    # Execute JS and then verify whether the active page becomes target_page.
+                    prev_draw = draw_marker()
                     try:
-                        # Clear any alerts first
-                        try:
-                            Alert(driver).accept()
-                        except:
-                            pass
+                        res = driver.execute_script(js)
+                    except InvalidSessionIdException:
+                        raise
+                    except Exception as e:
+                        res = None
+                        print(f"go_to_page JS exec error: {e}")
 
-                        # Try to call DataTables API via JS. Use page index (0-based).
-                        js = ("(function(){"
-                              "var tblEl = document.querySelector('table.dataTable');"
-                              "if(!tblEl) return 'no-table';"
-                              "var dt = null;"
-                              "try{ dt = $(tblEl).DataTable(); }catch(e){}"
-                              "if(!dt){ try{ dt = $.fn.dataTable.Api(tblEl); }catch(e){} }"
-                              "if(!dt) return 'no-dt';"
-                              "try{ dt.page(%d).draw(false); return 'ok'; }catch(e){ return 'err'; }"
-                              "})();") % (target_page - 1)
-
-                        # Execute JS and then verify whether the active page becomes target_page.
-                        try:
-                            res = driver.execute_script(js)
-                        except InvalidSessionIdException:
-                            raise
-                        except Exception as e:
-                            res = None
-                            print(f"go_to_page JS exec error: {e}")
+                    # Give the table time to redraw
+                    await_redraw(prev_draw, 2)
 
-                        # Give the table time to redraw
-                        time.sleep(2)
+                    # Check active page number explicitly
+                    try:
+                        active_el = driver.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link")
+                        if active_el and active_el.text.strip().isdigit() and int(active_el.text.strip()) == target_page:
+                            return True
+                    except Exception:
+                        pass
 
-                        # Check active page number explicitly
-                        try:
-                            active_el = driver.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link")
-                            if active_el and active_el.text.strip().isdigit() and int(active_el.text.strip()) == target_page:
-                                return True
-                        except Exception:
-                            pass
+                    # If JS returned a diagnostic string, log it
+                    if isinstance(res, str):
+                        print(f"DataTables jump returned: {res}")
 
-                        # If JS returned a diagnostic string, log it
-                        if isinstance(res, str):
-                            print(f"DataTables jump returned: {res}")
+                    # One last short wait and re-check
+                    pause(1)
+                    try:
+                        active_el = driver.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link")
+                        if active_el and active_el.text.strip().isdigit() and int(active_el.text.strip()) == target_page:
+                            return True
+                    except Exception:
+                        pass
 
-                        # One last short wait and re-check
-                        time.sleep(1)
-                        try:
-                            active_el = driver.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link")
-                            if active_el and active_el.text.strip().isdigit() and int(active_el.text.strip()) == target_page:
-                                return True
-                        except Exception:
-                            pass
+                    # Not successful this attempt
+                    print(f"DataTables jump did not move to page {target_page} (JS res={res})")
 
-                        # Not successful this attempt
-                        print(f"DataTables jump did not move to page {target_page} (JS res={res})")
+                except UnexpectedAlertPresentException:
+                    try:
+                        Alert(driver).accept()
+                    except:
+                        pass
+                    time.sleep(1)
+                except InvalidSessionIdException:
+                    # Driver lost session — propagate so caller can re-init
+                    raise
+                except Exception as e:
+                    print(f"go_to_page attempt error: {e}")
+                    time.sleep(1)
+            return False
+
+        # Navigate to start page
+        if page > 1:
+            print(f"Navigating to page {page}...")
+            current_page = 1
 
-                    except UnexpectedAlertPresentException:
-                        try:
-                            Alert(driver).accept()
-                        except:
-                            pass
-                        time.sleep(1)
-                    except InvalidSessionIdException:
-                        # Driver lost session — propagate so caller can re-init
-                        raise
-                    except Exception as e:
-                        print(f"go_to_page attempt error: {e}")
-                        time.sleep(1)
-                return False
-                
             # Track repeated failures to make a stronger recovery if pagination gets stuck
             stuck_attempts = 0
             while current_page < page:
                 try:
                     # Wait for navigation elements to be present
                     wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "ul.pagination")))
-                    time.sleep(1)  # Give extra time for pagination to stabilize
+                    pause(1)  # Give extra time for pagination to stabilize
                     
                     # Get current visible page number
                     active_page = driver.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link")
                     current_page = int(active_page.text)
-                    print(f"Currently at page {current_page}")
+                    log(f"Currently at page {current_page}", 'debug')
 
                     # Try DataTables API jump directly to the target page (fast) as first attempt
                     try:
@@ -766,19 +2320,20 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                         available_targets = [n for n in page_numbers if n > current_page]
                         if available_targets:
                             target = min(available_targets)  # Take the next available page
-                            print(f"Found clickable page {target}")
+                            log(f"Found clickable page {target}", 'debug')
                             
                             # Find and click the target page button
                             for btn in page_buttons:
                                 if btn.text.strip().isdigit() and int(btn.text.strip()) == target:
-                                    print(f"Clicking page {target} button...")
+                                    log(f"Clicking page {target} button...", 'debug')
                                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", btn)
-                                    time.sleep(0.5)
+                                    pause(0.5)
 
                                     # Try multiple click/dispatch methods. After each attempt, verify the active page.
                                     clicked = False
                                     for click_attempt in range(4):
                                         try:
+                                            prev_draw = draw_marker()
                                             if click_attempt == 0:
                                                 driver.execute_script("arguments[0].click();", btn)
                                             elif click_attempt == 1:
@@ -800,7 +2355,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                                                 except InvalidSessionIdException:
                                                     raise
 
-                                            time.sleep(1.5)
+                                            await_redraw(prev_draw, 1.5)
                                             handle_alerts()
 
                                             # Verify the page changed
@@ -847,7 +2402,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                                                     except:
                                                         pass
                                                     driver = init_driver()
-                                                    driver.get("https://greenbook.nafdac.gov.ng/")
+                                                    driver.get(base_url)
                                                     wait = WebDriverWait(driver, 20)
                                                     wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable")))
                                                     time.sleep(2)
@@ -873,7 +2428,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                             continue  # Skip the next button click for this iteration
                     
                     # If no page numbers were clickable or found, use next button
-                    print(f"Using next button to advance from page {current_page}...")
+                    log(f"Using next button to advance from page {current_page}...", 'debug')
                     safe_click_next()
                     
                     # Verify the page changed
@@ -881,7 +2436,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                     wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable tbody tr")))
                     
                     # Small pause to let the page stabilize
-                    time.sleep(1)
+                    pause(1)
                         
                 except Exception as e:
                     print(f"Error during navigation: {e}")
@@ -915,7 +2470,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                             except:
                                 pass
                             driver = init_driver()
-                            driver.get("https://greenbook.nafdac.gov.ng/")
+                            driver.get(base_url)
                             wait = WebDriverWait(driver, 20)
                             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable")))
                             time.sleep(2)
@@ -930,44 +2485,40 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
         # Per-page failure tracking so we can skip problematic pages
         page_failures = {}
 
+        METRICS.set('rows_target', max(0, (end_page - page + 1) * DISPLAY_PAGE_LENGTH))
         while page <= end_page:
-            print(f"Scraping page {page}...")
+            log(f"Scraping page {page}...", 'debug')
             try:
-                # Get rows from current page
-                rows = driver.find_elements(By.CSS_SELECTOR, "table.dataTable tbody tr")
-                print(f"Found {len(rows)} rows on page {page}")
-
-                # Extract data from rows
-                page_data = []
-                for row in rows:
-                    try:
-                        cells = row.find_elements(By.TAG_NAME, "td")
-                        row_data = [cell.text.strip() for cell in cells]
-                        if row_data:
-                            page_data.append(row_data)
-                    except Exception:
-                        continue
+                # Prefer the JSON the table was drawn from; otherwise extract all rows in one round trip
+                page_data = None
+                if capture_xhr:
+                    with METRICS.timer('row_extraction_seconds', source='xhr'):
+                        captured = read_datatables_xhr(driver)
+                        if captured:
+                            page_data = normalize_api_rows(parse_api_payload(captured[-1]['payload'])[0])
+                if page_data is None:
+                    page_data = extract_table_rows(driver)
+                log(f"Found {len(page_data)} rows on page {page}", 'debug')
+
+                if delta:
+                    page_data = [r for r in page_data if sink.row_state(r) != 'known']
+                    if not page_data:
+                        print(f"Delta: page {page} has only known records; stopping")
+                        break
 
-                # Add to main data list
                 # Add to main data list
                 data.extend(page_data)
-                print(f"Total records collected: {len(data)}")
+                log(f"Total records collected: {len(data) if full_data_loaded else rows_done + len(data)}", 'debug')
 
                 # Append this page's rows to CSV checkpoint (fast and robust)
-                csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
                 try:
-                    append_rows_to_csv(page_data, csv_checkpoint)
+                    if delta:
+                        sink.write_delta(page_data)
+                    else:
+                        sink.write_page(page_data, page=page, order='default')
                 except Exception as e:
                     print(f"Warning: failed to append to CSV checkpoint: {e}")
 
-                # Save Excel checkpoint less frequently (lighter schedule)
-                if page % 50 == 0:
-                    print(f"Saving Excel checkpoint at page {page}...")
-                    try:
-                        save_to_excel(data, output_file)
-                    except Exception as e:
-                        print(f"Warning: failed to save Excel checkpoint: {e}")
-
             except Exception as e:
                 # Record failure for this page and try to recover/skip
                 fail_count = page_failures.get(page, 0) + 1
@@ -983,7 +2534,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                         except:
                             pass
                         driver = init_driver()
-                        driver.get("https://greenbook.nafdac.gov.ng/")
+                        driver.get(base_url)
                         wait = WebDriverWait(driver, 20)
                         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable")))
                         time.sleep(2)
@@ -1005,7 +2556,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                 if fail_count >= 3:
                     print(f"Page {page} failing repeatedly — skipping to next page")
                     try:
-                        log_skipped_page(page, str(e))
+                        log_skipped_page(page, str(e), log_path=skip_log)
                     except Exception:
                         pass
                     # Try to jump to the next page using DataTables API; fallback to clicking next
@@ -1020,8 +2571,9 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                     try:
                         nb = driver.find_element(By.CSS_SELECTOR, "li.page-item.next:not(.disabled) a")
                         try:
+                            prev_draw = draw_marker()
                             driver.execute_script("arguments[0].click();", nb)
-                            time.sleep(1)
+                            await_redraw(prev_draw, 1)
                             page += 1
                             continue
                         except Exception:
@@ -1064,7 +2616,7 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                         pass
 
                     driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
-                    time.sleep(1)  # Increased pause before click
+                    pause(1)  # Increased pause before click
                     
                     # Click using JavaScript to avoid potential intercepted click
                     # click and wait until the active page number changes (more reliable than staleness_of)
@@ -1073,26 +2625,51 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                     except:
                         prev_active = None
 
-                    driver.execute_script("arguments[0].click();", next_button)
+                    prev_draw = draw_marker()
+                    # Page turns are paced by the same controller as API requests
+                    nav_start = None
+                    if controller:
+                        nav_start = controller.acquire()
+                        report_pacing(controller)
+                    nav_t0 = time.perf_counter()
+                    nav_outcome = {'error': True}
+                    try:
+                        driver.execute_script("arguments[0].click();", next_button)
+                        await_redraw(prev_draw, 0)
 
-                    def active_page_changed(drv):
-                        try:
-                            cur = drv.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link").text
-                            return cur != prev_active
-                        except:
-                            return False
+                        def active_page_changed(drv):
+                            try:
+                                cur = drv.find_element(By.CSS_SELECTOR, "li.page-item.active a.page-link").text
+                                return cur != prev_active
+                            except:
+                                return False
 
-                    try:
-                        wait.until(active_page_changed)
-                    except:
-                        # Fallback: wait for table rows to be present
                         try:
-                            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable tbody tr")))
+                            wait.until(active_page_changed)
+                            nav_outcome = {}
+                        except UnexpectedAlertPresentException:
+                            raise
                         except:
-                            pass
-
-                    time.sleep(1)  # small pause for table to fully update
+                            nav_outcome = {'timeout': True}
+                            # Fallback: wait for table rows to be present
+                            try:
+                                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.dataTable tbody tr")))
+                            except:
+                                pass
+                    except UnexpectedAlertPresentException:
+                        nav_outcome = {'throttled': True}
+                        raise
+                    finally:
+                        METRICS.observe('page_navigation_seconds', time.perf_counter() - nav_t0,
+                                        outcome=next(iter(nav_outcome), 'ok'))
+                        if controller:
+                            controller.release(nav_start, **nav_outcome)
+                            report_pacing(controller)
+
+                    pause(1)  # small pause for table to fully update
                     page += 1
+                    if controller and page % 50 == 0:
+                        log(f"Pacing: {controller.describe()}")
                     break  # Success, exit retry loop
                     
                 except UnexpectedAlertPresentException:
@@ -1116,8 +2693,11 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                         return
         
         # Save final data to Excel (convert checkpoint CSV to Excel using streaming if available)
+        sink.commit()
         csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
-        if csv_only:
+        if sink.kind != 'csv':
+            export_store(sink, output_file, csv_only=csv_only)
+        elif csv_only:
             print(f"--csv-only set: leaving CSV checkpoint in place at {csv_checkpoint} and skipping Excel conversion.")
         else:
             if os.path.exists(csv_checkpoint):
@@ -1126,58 +2706,152 @@ def scrape_greenbook(output_file="nafdac_greenbook.xlsx", end_page=876, resume=T
                     csv_to_excel_stream(csv_checkpoint, output_file)
                 except Exception as e:
                     print(f"Failed to convert CSV to Excel: {e}. Falling back to in-memory save.")
-                    save_to_excel(data, output_file)
+                    if not full_data_loaded:
+                        data, _ = load_existing_data(output_file)
+                    with METRICS.timer('excel_save_seconds', kind='final'):
+                        save_to_excel(data, output_file)
             else:
+                if not full_data_loaded:
+                    # Checkpoint came from the Excel file; keep its rows ahead of this run's
+                    data = load_existing_data(output_file)[0] + data
                 print(f"Saving {len(data)} records to {output_file}")
-                save_to_excel(data, output_file)
+                with METRICS.timer('excel_save_seconds', kind='final'):
+                    save_to_excel(data, output_file)
         
         print("Scraping completed successfully")
         
     except Exception as e:
         print(f"Error occurred: {str(e)}")
     finally:
+        report_nav_wait_stats()
+        if cache:
+            print(cache.describe())
+            cache.close()
+        sink.close()
         driver.quit()
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="NAFDAC Greenbook scraper")
-    parser.add_argument("--start", type=int, help="Start page (overrides resume detection)")
-    parser.add_argument("--end", type=int, default=876, help="End page")
-    parser.add_argument("--driver", type=str, help="Full path to chromedriver executable to avoid auto-download")
-    parser.add_argument("--file", type=str, default="nafdac_greenbook.xlsx", help="Output Excel file path")
-    parser.add_argument("--no-headless", action="store_true", help="Run Chrome with visible UI for debugging")
-    parser.add_argument("--debug", action="store_true", help="Enable debug JS dumps to stdout")
-    parser.add_argument("--force-api", action="store_true", help="Run using HTTP API only (no Selenium) if possible")
-    parser.add_argument("--csv-only", action="store_true", help="Only write/appends to CSV checkpoint and skip Excel conversion")
-    args = parser.parse_args()
-
-    # Determine start page precedence: CLI arg > START_PAGE env var > start_page.txt file > existing checkpoint
-    default_start = None
-    # CLI will override; but if not provided, check env/file
-    env_val = os.environ.get('START_PAGE')
-    if env_val:
-        try:
-            default_start = int(env_val)
-            print(f"Using START_PAGE from environment: {default_start}")
-        except Exception:
-            default_start = None
-    # start_page.txt takes next precedence
-    if default_start is None and os.path.exists('start_page.txt'):
-        try:
-            with open('start_page.txt', 'r', encoding='utf-8') as f:
-                txt = f.read().strip()
-                default_start = int(txt)
-                print(f"Using start_page from start_page.txt: {default_start}")
-        except Exception:
-            default_start = None
+def _scrape_shard(shard):
+    """Process-pool entry point: scrape one page range into its own shard checkpoint."""
+    idx, first, last, shard_file, kwargs = shard
+    shard_csv = os.path.splitext(shard_file)[0] + ".csv"
+    manifest = load_checkpoint_summary(shard_csv) or {}
+    done_page = manifest.get('last_page') or (first - 1)
+    start = max(first, done_page + 1)
+    if start > last:
+        print(f"[shard {idx}] pages {first}-{last} already complete")
+        return idx
+    print(f"[shard {idx}] scraping pages {start}-{last}")
+    scrape_greenbook(output_file=shard_file, start_page=start, end_page=last, csv_only=True,
+                     browser_only=True,
+                     skip_log=os.path.splitext(shard_file)[0] + ".skipped.log", **kwargs)
+    return idx
+
+
+def merge_shards(shards, csv_checkpoint, batch_size=500, store=None):
+    """Append shard checkpoints to the main CSV checkpoint (or `store`) in page order, then remove them.
+    Pages a shard did not reach are recorded in skipped_pages.log.
+    """
+    own_store = store is None
+    if own_store:
+        store = CsvCheckpoint(csv_checkpoint)
+    merged = 0
+    for idx, first, last, shard_file, _ in sorted(shards, key=lambda sh: sh[1]):
+        base = os.path.splitext(shard_file)[0]
+        shard_csv = base + ".csv"
+        shard_log = base + ".skipped.log"
+        # A shard killed mid-group leaves uncommitted rows past its manifest; drop them
+        truncate_uncommitted_tail(shard_csv)
+        manifest = load_checkpoint_summary(shard_csv) or {}
+        if os.path.exists(shard_csv):
+            with open(shard_csv, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                batch = []
+                for row in reader:
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        store.write_page(batch, order='default')
+                        merged += len(batch)
+                        batch = []
+                store.write_page(batch, page=manifest.get('last_page'), order='default')
+                merged += len(batch)
+        reached = manifest.get('last_page') or (first - 1)
+        if reached < last:
+            print(f"[shard {idx}] stopped at page {reached} of {first}-{last}")
+            for p in range(reached + 1, last + 1):
+                log_skipped_page(p, f"shard {idx} incomplete")
+        if os.path.exists(shard_log):
+            with open(shard_log, encoding='utf-8') as src, open("skipped_pages.log", 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+        for path in (shard_csv, manifest_path(shard_csv), shard_log):
+            if os.path.exists(path):
+                os.remove(path)
+    if own_store:
+        store.close()
+    else:
+        store.commit()
+    print(f"Merged {merged} shard rows into the {store.kind} checkpoint")
+    return merged
+
+
+def scrape_greenbook_sharded(output_file="nafdac_greenbook.xlsx", start_page=None, end_page=876, shards=2, driver_path=None, csv_only=False, store="csv", **kwargs):
+    """Split the page range across `shards` browser processes, then merge their checkpoints in order.
+    Each shard jumps to its first page, keeps its own failure/skip accounting and resumes from
+    its own checkpoint if a previous sharded run over the same range was interrupted.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    csv_checkpoint = os.path.splitext(output_file)[0] + ".csv"
+    sink = open_store(store, output_file, commit_pages=kwargs.get('commit_pages', 10),
+                      commit_seconds=kwargs.get('commit_seconds', 5.0), fsync=kwargs.get('fsync', False))
+    if not start_page:
+        summary = sink.summary() or {}
+        start_page = (summary.get('rows', 0) // DISPLAY_PAGE_LENGTH) + 1
+    start_page = int(start_page)
+    if start_page > end_page:
+        print(f"Nothing to scrape: start page {start_page} is past end page {end_page}")
+        sink.close()
+        return
+
+    # Resolve chromedriver once so shards do not race on the download
+    if not driver_path:
+        driver_path = resolve_chromedriver()
+
+    shards = max(1, min(int(shards), end_page - start_page + 1))
+    span = end_page - start_page + 1
+    base = os.path.splitext(output_file)[0]
+    plan = []
+    first = start_page
+    for i in range(shards):
+        size = span // shards + (1 if i < span % shards else 0)
+        last = first + size - 1
+        shard_file = f"{base}.shard{i:02d}-{first}-{last}.xlsx"
+        plan.append((i, first, last, shard_file, dict(kwargs, driver_path=driver_path)))
+        first = last + 1
+
+    print(f"Scraping pages {start_page}-{end_page} with {shards} browser shards")
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        futures = {pool.submit(_scrape_shard, sh): sh for sh in plan}
+        for fut in as_completed(futures):
+            idx = futures[fut][0]
+            try:
+                fut.result()
+                print(f"[shard {idx}] finished")
+            except Exception as e:
+                print(f"[shard {idx}] failed: {e}")
 
-    # If still not provided, try to compute from existing CSV/XLSX checkpoints
-    if default_start is None:
-        computed = compute_start_page_from_files()
-        if computed:
-            default_start = computed
-            print(f"Detected existing checkpoint; computed start page: {default_start}")
+    merge_shards(plan, csv_checkpoint, store=sink)
+    if sink.kind != 'csv':
+        export_store(sink, output_file, csv_only=csv_only)
+    elif csv_only:
+        print(f"--csv-only set: leaving CSV checkpoint in place at {csv_checkpoint} and skipping Excel conversion.")
+    else:
+        csv_to_excel_stream(csv_checkpoint, output_file)
+    sink.close()
 
-    start_arg = args.start if args.start is not None else default_start
 
-    # Call scraper with csv_only flag
-    scrape_greenbook(output_file=args.file, end_page=args.end, resume=True, driver_path=args.driver, start_page=start_arg, no_headless=args.no_headless, debug=args.debug, force_api=args.force_api, csv_only=args.csv_only)
+if __name__ == "__main__":
+    # The command line (flat flags or subcommands) is defined in cli.py
+    import sys
+    from cli import main
+    sys.exit(main(legacy=True))
@@ -0,0 +1,222 @@
+"""SQLite storage backend for scraper checkpoints.
+
+Rows are upserted on NAFDAC Reg No through a unique index, one transaction per page, so
+re-scraping an overlapping page never produces duplicates. Row count, last key and the
+last page/offset are kept in a small meta table so resume can read them in constant time.
+
+Usage (from run.py):
+  py run.py --force-api --store sqlite
+"""
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from columns import REG_NO_INDEX
+from metrics import METRICS, log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    reg_no TEXT NOT NULL,
+    row_json TEXT NOT NULL,
+    page INTEGER,
+    offset INTEGER,
+    scraped_at TEXT,
+    row_hash TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS records_reg_no ON records(reg_no);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+# Meta keys reported by SQLiteStore.summary() and read_summary()
+SUMMARY_KEYS = ('rows', 'last_reg_no', 'last_page', 'next_offset', 'endpoint', 'page_length', 'order', 'updated')
+
+
+def read_summary(db_path):
+    """Return the summary of an existing store opened read-only, or None if there is none.
+    Unlike SQLiteStore this never creates the database or migrates its schema.
+    """
+    if not os.path.exists(db_path):
+        return None
+    # Without a WAL left behind the file holds every commit, so no -shm/-wal needs creating either
+    flags = "mode=ro" if os.path.exists(db_path + "-wal") else "mode=ro&immutable=1"
+    conn = sqlite3.connect(f"file:{db_path}?{flags}", uri=True)
+    try:
+        meta = {}
+        for key, value in conn.execute("SELECT key, value FROM meta"):
+            meta[key] = json.loads(value)
+        if meta.get('rows') is None:
+            meta['rows'] = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        conn.close()
+    return {k: meta.get(k) for k in SUMMARY_KEYS}
+
+
+def row_hash(row):
+    """Content hash of a row, used to tell changed records from known ones."""
+    cells = [str(c).strip() if c is not None else '' for c in row]
+    return hashlib.sha1(json.dumps(cells, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def record_key(row):
+    """Return the unique key for a row: its Reg No, or a content hash if the Reg No is blank."""
+    reg_no = str(row[REG_NO_INDEX]).strip() if len(row) > REG_NO_INDEX and row[REG_NO_INDEX] is not None else ''
+    if reg_no:
+        return reg_no
+    digest = hashlib.sha1(json.dumps(row, ensure_ascii=False).encode('utf-8')).hexdigest()
+    return f"row:{digest}"
+
+
+class SQLiteStore:
+    """Checkpoint store backed by a single SQLite file."""
+
+    kind = 'sqlite'
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = [r[1] for r in self.conn.execute("PRAGMA table_info(records)")]
+        if 'row_hash' not in columns:
+            self.conn.execute("ALTER TABLE records ADD COLUMN row_hash TEXT")
+        self.conn.commit()
+        if self._get_meta('rows') is None:
+            # New database, or one created before the meta counters existed
+            count = self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            self._set_meta('rows', count)
+            self.conn.commit()
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT INTO meta(key, value) VALUES(?, ?) "
+                          "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, json.dumps(value)))
+
+    @METRICS.timer('checkpoint_write_seconds', store='sqlite')
+    def write_page(self, rows, page=None, offset=None, endpoint=None, page_length=None, resume_meta=True, order=None):
+        """Upsert one page of rows in a single transaction.
+        With resume_meta=False (gap filling) the resume position in the meta table is left alone.
+        Returns (inserted, updated) counts.
+        """
+        if not rows:
+            return 0, 0
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        inserted = updated = 0
+        with self.conn:
+            for i, row in enumerate(rows):
+                key = record_key(row)
+                row_offset = offset + i if offset is not None else None
+                row_json = json.dumps(list(row), ensure_ascii=False)
+                digest = row_hash(row)
+                existing = self.conn.execute("SELECT id FROM records WHERE reg_no = ?", (key,)).fetchone()
+                if existing:
+                    # Without a page/offset (delta sync) the stored provenance is kept
+                    self.conn.execute("UPDATE records SET row_json = ?, page = COALESCE(?, page), offset = COALESCE(?, offset), "
+                                      "scraped_at = ?, row_hash = ? WHERE id = ?",
+                                      (row_json, page, row_offset, now, digest, existing[0]))
+                    updated += 1
+                else:
+                    self.conn.execute("INSERT INTO records(reg_no, row_json, page, offset, scraped_at, row_hash) VALUES(?, ?, ?, ?, ?, ?)",
+                                      (key, row_json, page, row_offset, now, digest))
+                    inserted += 1
+            self._set_meta('rows', self._get_meta('rows', 0) + inserted)
+            if resume_meta:
+                self._set_meta('last_reg_no', record_key(rows[-1]))
+                if page is not None:
+                    self._set_meta('last_page', page)
+                if offset is not None:
+                    self._set_meta('next_offset', offset + len(rows))
+                if endpoint is not None:
+                    self._set_meta('endpoint', endpoint)
+                if page_length is not None:
+                    self._set_meta('page_length', page_length)
+                if order is not None:
+                    self._set_meta('order', order)
+            self._set_meta('updated', now)
+        METRICS.inc('rows_written_total', len(rows))
+        METRICS.inc('pages_written_total')
+        if updated:
+            log(f"Store: {inserted} new, {updated} updated rows (page {page})", 'debug')
+        return inserted, updated
+
+    def write_delta(self, rows):
+        """Upsert delta-sync rows, leaving the resume position and stored page/offset provenance alone."""
+        return self.write_page(rows, resume_meta=False)
+
+    def commit(self):
+        """Pages are committed as they are written; kept for parity with the CSV checkpoint."""
+        self.conn.commit()
+
+    def covers(self, offset, length):
+        """True if rows are stored for every offset in [offset, offset + length)."""
+        found = self.conn.execute("SELECT COUNT(DISTINCT offset) FROM records WHERE offset >= ? AND offset < ?",
+                                  (offset, offset + length)).fetchone()[0]
+        return found >= length
+
+    def insert_gap_rows(self, fills):
+        """Upsert gap rows with their page/offset provenance. `fills` are dicts with
+        'rows', 'page' and 'offset'. Returns the number of new rows.
+        """
+        inserted = 0
+        for fill in fills:
+            new, _ = self.write_page(fill['rows'], page=fill.get('page'), offset=fill.get('offset'), resume_meta=False)
+            inserted += new
+        return inserted
+
+    def contains(self, reg_no):
+        """Index lookup: True if a record with this Reg No is stored."""
+        return self.conn.execute("SELECT 1 FROM records WHERE reg_no = ?", (str(reg_no).strip(),)).fetchone() is not None
+
+    def row_state(self, row):
+        """Return 'new', 'changed' or 'known' for a scraped row (one index lookup)."""
+        found = self.conn.execute("SELECT row_json, row_hash FROM records WHERE reg_no = ?", (record_key(row),)).fetchone()
+        if not found:
+            return 'new'
+        stored_hash = found[1] or row_hash(json.loads(found[0]))
+        return 'known' if stored_hash == row_hash(row) else 'changed'
+
+    def summary(self, rebuild=True):
+        """Return a manifest-shaped dict (rows, last_reg_no, last_page, ...) read from the meta table."""
+        return {k: self._get_meta(k) for k in SUMMARY_KEYS}
+
+    def iter_rows(self, by_offset=False):
+        """Yield stored rows in first-seen order, or with by_offset=True in source offset order
+        (gap rows back in place; rows without an offset, e.g. from delta sync, last).
+        """
+        order = "offset IS NULL, offset, id" if by_offset else "id"
+        for (row_json,) in self.conn.execute(f"SELECT row_json FROM records ORDER BY {order}"):
+            yield json.loads(row_json)
+
+    def export_csv(self, csv_path, header):
+        """Write every stored row to `csv_path` (atomically) in source offset order. Returns (row count, last row)."""
+        tmp = csv_path + ".tmp"
+        count = 0
+        last = None
+        with open(tmp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for row in self.iter_rows(by_offset=True):
+                writer.writerow(row)
+                count += 1
+                last = row
+        os.replace(tmp, csv_path)
+        return count, last
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Local stand-in for greenbook.nafdac.gov.ng, for testing and benchmarking the scraper offline.
+
+Usage:
+  py standin_server.py --port 8800 --rows 20000 --latency 0.05
+  py standin_server.py --fixture nafdac_greenbook.csv --max-length 500 --error-rate 0.02
+  py run.py --force-api --base-url http://127.0.0.1:8800/
+
+Serves a DataTables page at / and its server-side endpoint at /api (GET or POST) with
+start/length paging, order[0][column]/dir sorting, search[value] filtering and
+recordsTotal/recordsFiltered. Responses carry an ETag and honour If-None-Match.
+Misbehaviour can be dialled in: --latency/--jitter per request, --max-length caps the page
+length, --error-rate answers HTTP 500, --throttle answers 429 above N requests/s, and
+--alert-rate returns a DataTables error payload, which the page shows as a browser alert.
+
+The page loads jQuery/DataTables from a CDN; pass --static-dir with local copies of
+jquery.min.js, jquery.dataTables.min.js and dataTables.bootstrap5.min.js (plus the
+bootstrap/DataTables css, optional) to run the browser fully offline.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from columns import GREENBOOK_COLUMNS as COLUMNS
+
+# Page asset: (file name under --static-dir, CDN URL)
+ASSETS = {
+    "jquery": ("jquery.min.js", "https://code.jquery.com/jquery-3.7.1.min.js"),
+    "datatables": ("jquery.dataTables.min.js", "https://cdn.datatables.net/1.13.8/js/jquery.dataTables.min.js"),
+    "datatables_bootstrap": ("dataTables.bootstrap5.min.js", "https://cdn.datatables.net/1.13.8/js/dataTables.bootstrap5.min.js"),
+    "bootstrap_css": ("bootstrap.min.css", "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css"),
+    "datatables_css": ("dataTables.bootstrap5.min.css", "https://cdn.datatables.net/1.13.8/css/dataTables.bootstrap5.min.css"),
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Greenbook stand-in</title>
+<link rel="stylesheet" href="{bootstrap_css}">
+<link rel="stylesheet" href="{datatables_css}">
+</head><body>
+<table id="greenbook" class="table table-striped" style="width:100%">
+<thead><tr>{header}</tr></thead><tbody></tbody></table>
+<script src="{jquery}"></script>
+<script src="{datatables}"></script>
+<script src="{datatables_bootstrap}"></script>
+<script>
+$(function(){{ $('#greenbook').DataTable({{serverSide: true, processing: true, pageLength: 10, ajax: {{url: 'api'}}}}); }});
+</script>
+</body></html>
+"""
+
+CATEGORIES = ["Drugs", "Veterinary", "Medical devices", "Vaccines and Biologics", "Herbal"]
+FORMS = ["Tablet", "Capsule", "Syrup", "Suspension", "Injection", "Cream", "Solution/Drops", "Gel"]
+ROUTES = ["Oral", "Topical", "Intravenous", "Intramuscular", "Ophthalmic"]
+STRENGTHS = ["5 mg", "10 mg", "20 mg", "50 mg", "100 mg", "250 mg", "500 mg", "1 g", "0.5%", "2%"]
+INGREDIENTS = ["Paracetamol", "Ibuprofen", "Amoxicillin", "Metformin", "Artemether; Lumefantrine",
+               "Diclofenac Potassium", "Omeprazole", "Ciprofloxacin", "Lisinopril", "Cabergoline"]
+
+
+def synthetic_rows(n, seed=42):
+    """Deterministic Greenbook-like rows with the site's repetition pattern."""
+    rnd = random.Random(seed)
+    applicants = [f"Applicant {i} Pharmaceutical Ltd" for i in range(max(10, n // 20))]
+    rows = []
+    for i in range(n):
+        ingredient = rnd.choice(INGREDIENTS)
+        form = rnd.choice(FORMS)
+        rows.append([
+            f"{ingredient.split(';')[0]} {form} {i}", ingredient, rnd.choice(CATEGORIES),
+            f"{'ABC'[i % 3]}4-{i:06d}", form, rnd.choice(ROUTES), rnd.choice(STRENGTHS),
+            rnd.choice(applicants), f"{2005 + rnd.randrange(20)}-{rnd.randrange(1, 13):02d}-{rnd.randrange(1, 29):02d}",
+            "Active" if rnd.random() < 0.9 else "Inactive",
+        ])
+    return rows
+
+
+def fixture_rows(path):
+    """Rows of a CSV checkpoint (header skipped, blank rows dropped, padded to 10 cells)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [(row + [''] * len(COLUMNS))[:len(COLUMNS)] for row in reader if any(c.strip() for c in row)]
+
+
+class StandinState:
+    """Dataset and fault settings shared by the request handlers."""
+
+    def __init__(self, rows, latency=0.0, jitter=0.0, max_length=100, error_rate=0.0, alert_rate=0.0,
+                 throttle=0.0, static_dir=None, seed=1):
+        self.rows = rows
+        self.latency = latency
+        self.jitter = jitter
+        self.max_length = max_length
+        self.error_rate = error_rate
+        self.alert_rate = alert_rate
+        self.throttle = throttle
+        self.static_dir = static_dir
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._recent = []
+        self._sorted = {}
+
+    def sorted_rows(self, column, direction):
+        """Rows ordered by `column` (case-insensitively, like the site's collation)."""
+        key = (column, direction)
+        if key not in self._sorted:
+            rows = self.rows if column is None else sorted(self.rows, key=lambda r: r[column].casefold(), reverse=direction == 'desc')
+            self._sorted[key] = rows
+        return self._sorted[key]
+
+    def admit(self):
+        """Return 'ok', 'error', 'alert' or 'throttle' for the next request."""
+        with self._lock:
+            self.requests += 1
+            now = time.time()
+            if self.throttle:
+                self._recent = [t for t in self._recent if t > now - 1]
+                if len(self._recent) >= self.throttle:
+                    return 'throttle'
+                self._recent.append(now)
+            roll = self.random.random()
+        if roll < self.error_rate:
+            return 'error'
+        if roll < self.error_rate + self.alert_rate:
+            return 'alert'
+        return 'ok'
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b"", content_type="application/json", headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path in ("/", "/index.html"):
+                return self._page()
+            if url.path.startswith("/static/") and state.static_dir:
+                return self._static(os.path.basename(url.path))
+            if url.path.rstrip("/").endswith("/api"):
+                return self._api(parse_qs(url.query))
+            self._send(404, b"not found", "text/plain")
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            params = parse_qs(self.rfile.read(length).decode("utf-8")) if length else {}
+            if url.path.rstrip("/").endswith("/api"):
+                return self._api(params)
+            self._send(404, b"not found", "text/plain")
+
+        def _page(self):
+            assets = {key: (f"static/{name}" if state.static_dir else url) for key, (name, url) in ASSETS.items()}
+            header = "".join(f"<th>{c}</th>" for c in COLUMNS)
+            body = PAGE_TEMPLATE.format(header=header, **assets).encode("utf-8")
+            self._send(200, body, "text/html; charset=utf-8")
+
+        def _static(self, name):
+            path = os.path.join(state.static_dir, name)
+            if not os.path.exists(path):
+                return self._send(404, b"not found", "text/plain")
+            with open(path, 'rb') as f:
+                body = f.read()
+            self._send(200, body, "text/css" if name.endswith(".css") else "application/javascript")
+
+        def _api(self, q):
+            def param(name, default=None):
+                return q.get(name, [default])[0]
+
+            if state.latency or state.jitter:
+                time.sleep(max(0.0, state.latency + state.random.uniform(-state.jitter, state.jitter)))
+            verdict = state.admit()
+            if verdict == 'throttle':
+                return self._send(429, b"", headers={"Retry-After": "1"})
+            if verdict == 'error':
+                return self._send(500, b"server error", "text/plain")
+
+            draw = int(param('draw', '1') or 1)
+            if verdict == 'alert':
+                body = json.dumps({"draw": draw, "error": "Too many requests, please try again later"}).encode()
+                return self._send(200, body)
+
+            try:
+                start = max(0, int(param('start', '0')))
+                length = int(param('length', '10'))
+            except ValueError:
+                return self._send(400, b"bad paging parameters", "text/plain")
+            if length < 0 or length > state.max_length:
+                length = state.max_length
+            column = param('order[0][column]')
+            column = int(column) if column is not None and column.isdigit() and int(column) < len(COLUMNS) else None
+            rows = state.sorted_rows(column, param('order[0][dir]', 'asc'))
+            search = (param('search[value]') or '').strip().lower()
+            if search:
+                rows = [r for r in rows if any(search in c.lower() for c in r)]
+            payload = {"recordsTotal": len(state.rows), "recordsFiltered": len(rows), "data": rows[start:start + length]}
+            etag = '"%s"' % hashlib.sha1(json.dumps(payload).encode()).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", headers={"ETag": etag})
+            payload["draw"] = draw
+            self._send(200, json.dumps(payload).encode(), headers={"ETag": etag})
+
+    return Handler
+
+
+def start_server(state, host="127.0.0.1", port=0):
+    """Start the stand-in in a background thread. Returns (server, base URL)."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def main():
+    p = argparse.ArgumentParser(description="Local DataTables stand-in for the NAFDAC Greenbook site")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8800)
+    p.add_argument("--rows", type=int, default=8760, help="Number of synthetic records (ignored with --fixture)")
+    p.add_argument("--fixture", help="Serve the rows of this CSV checkpoint instead of synthetic data")
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API response")
+    p.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds around --latency")
+    p.add_argument("--max-length", type=int, default=100, help="Largest page length the endpoint honours")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests answered with HTTP 500")
+    p.add_argument("--alert-rate", type=float, default=0.0, help="Fraction of API requests answered with a DataTables error (browser alert)")
+    p.add_argument("--throttle", type=float, default=0.0, help="Answer 429 above this many requests per second (0 = off)")
+    p.add_argument("--static-dir", help="Serve jQuery/DataTables assets from this directory instead of the CDN")
+    args = p.parse_args()
+
+    rows = fixture_rows(args.fixture) if args.fixture else synthetic_rows(args.rows)
+    state = StandinState(rows, latency=args.latency, jitter=args.jitter, max_length=args.max_length,
+                         error_rate=args.error_rate, alert_rate=args.alert_rate, throttle=args.throttle,
+                         static_dir=args.static_dir)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(f"Serving {len(rows)} records at http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
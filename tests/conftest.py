@@ -0,0 +1,47 @@
+"""Shared fixtures: a deterministic stand-in server (standin_server.py) per test."""
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin_server import StandinState, start_server, synthetic_rows  # noqa: E402
+
+ROWS = 3000
+
+
+@pytest.fixture
+def standin():
+    """Stand-in serving ROWS synthetic records; yields (state, base URL). state.rows may be edited."""
+    state = StandinState(synthetic_rows(ROWS), max_length=500)
+    server, base_url = start_server(state)
+    try:
+        yield state, base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory so skip logs and checkpoints stay out of the repo."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def read_rows(csv_path):
+    """Data rows of a CSV checkpoint, header skipped."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row for row in reader if any(cell.strip() for cell in row)]
+
+
+def scrape(base_url, output_file, **kwargs):
+    """run.scrape_api with the settings the tests share: no pacing, no caches, CSV only."""
+    import run
+    kwargs.setdefault('end_page', ROWS // run.DISPLAY_PAGE_LENGTH)
+    return run.scrape_api(output_file=str(output_file), csv_only=True, rate_control=False, cache_dir=None,
+                          base_url=base_url, endpoint_cache=None, **kwargs)
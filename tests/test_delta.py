@@ -0,0 +1,43 @@
+import run
+from conftest import ROWS, read_rows, scrape
+
+
+def new_record(i):
+    return [f"New Capsule {i}", "Omeprazole", "Drugs", f"D4-{i:06d}", "Capsule", "Oral",
+            "20 mg", "Applicant 2 Pharmaceutical Ltd", f"2031-01-{i + 1:02d}", "Active"]
+
+
+def test_delta_writes_new_and_changed_rows_then_stops(standin, workdir):
+    state, base_url = standin
+    output = workdir / "greenbook.xlsx"
+    scrape(base_url, output)
+    manifest = run.read_manifest(str(workdir / "greenbook.csv"))
+
+    changed = list(state.rows[42])
+    changed[run.APPROVAL_DATE_INDEX] = "2030-12-31"
+    changed[-1] = "Inactive" if changed[-1] == "Active" else "Active"
+    state.rows = [changed if i == 42 else r for i, r in enumerate(state.rows)] + [new_record(i) for i in range(5)]
+    state._sorted = {}
+    requests_before = state.requests
+
+    written = scrape(base_url, output, delta=True)
+
+    # The endpoint probe, then the first page with every change and a fully known second page
+    assert written == 6
+    assert state.requests - requests_before == 3
+    rows = read_rows(workdir / "greenbook.csv")
+    keys = [r[run.REG_NO_INDEX] for r in rows]
+    assert len(keys) == len(set(keys)) == ROWS + 5
+    assert changed in rows
+    after = run.read_manifest(str(workdir / "greenbook.csv"))
+    assert (after['last_reg_no'], after['next_offset']) == (manifest['last_reg_no'], manifest['next_offset'])
+
+
+def test_delta_on_unchanged_site_writes_nothing(standin, workdir):
+    state, base_url = standin
+    output = workdir / "greenbook.xlsx"
+    scrape(base_url, output)
+    before = (workdir / "greenbook.csv").read_bytes()
+
+    assert scrape(base_url, output, delta=True) == 0
+    assert (workdir / "greenbook.csv").read_bytes() == before
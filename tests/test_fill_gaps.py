@@ -0,0 +1,31 @@
+import run
+from conftest import read_rows, scrape
+
+
+def test_fill_gaps_restores_failed_page_in_place(standin, workdir, monkeypatch):
+    state, base_url = standin
+    output = workdir / "greenbook.xlsx"
+    fetch = run.fetch_api_page
+
+    def failing_fetch(session, ajax_url, start, length, *args, **kwargs):
+        if start == 1000:
+            raise run.DataTablesError("Too many requests, please try again later")
+        return fetch(session, ajax_url, start, length, *args, **kwargs)
+
+    monkeypatch.setattr(run, "fetch_api_page", failing_fetch)
+    scrape(base_url, output, page_length=100)
+    monkeypatch.setattr(run, "fetch_api_page", fetch)
+
+    assert len(read_rows(workdir / "greenbook.csv")) == 2900
+    entries = run.read_skip_log()
+    assert [(e['offset'], e['length'], e['resolved']) for e in entries] == [(1000, 100, None)]
+
+    added = run.fill_gaps(output_file=str(output), csv_only=True, rate_control=False, cache_dir=None,
+                          base_url=base_url, endpoint_cache=None)
+
+    assert added == 100
+    assert read_rows(workdir / "greenbook.csv") == state.sorted_rows(run.REG_NO_INDEX, 'asc')
+    assert all(e['resolved'] for e in run.read_skip_log())
+    # Resolved entries are not requested again
+    assert run.fill_gaps(output_file=str(output), csv_only=True, rate_control=False, cache_dir=None,
+                         base_url=base_url, endpoint_cache=None) == 0
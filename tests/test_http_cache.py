@@ -0,0 +1,53 @@
+import run
+from http_cache import ResponseCache, request_key
+
+
+def test_fresh_entries_are_served_without_a_request(standin, tmp_path):
+    state, base_url = standin
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=3600)
+    session = run.make_http_session(cache=cache)
+    params = {'start': 0, 'length': 10, 'draw': 1}
+    try:
+        first = run.api_request(session, base_url + "api", params)
+        requests = state.requests
+        # draw changes on every request but is not part of the key
+        again = run.api_request(session, base_url + "api", dict(params, draw=2))
+
+        assert again == first
+        assert state.requests == requests
+        assert (cache.hits, cache.misses) == (1, 1)
+    finally:
+        cache.close()
+
+
+def test_stale_entries_are_revalidated_with_etag(standin, tmp_path):
+    state, base_url = standin
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=0)
+    session = run.make_http_session(cache=cache)
+    params = {'start': 20, 'length': 10, 'draw': 1}
+    try:
+        first = run.api_request(session, base_url + "api", params)
+        again = run.api_request(session, base_url + "api", params)
+
+        assert again == first
+        assert cache.revalidated == 1
+    finally:
+        cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"), max_bytes=250)
+    try:
+        keys = []
+        for start in range(3):
+            params = {'start': start, 'length': 1}
+            keys.append(request_key("http://x/api", params))
+            cache.store(keys[-1], "http://x/api", params, 'GET', b"x" * 100)
+            if start == 1:
+                # Touch the first entry so the second is now the least recently used
+                cache.lookup("http://x/api", {'start': 0, 'length': 1})
+
+        stored = {row[0] for row in cache.conn.execute("SELECT key FROM responses")}
+        assert stored == {keys[0], keys[2]}
+    finally:
+        cache.close()
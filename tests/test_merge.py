@@ -0,0 +1,50 @@
+import csv
+
+import pytest
+
+from columns import GREENBOOK_COLUMNS, APPROVAL_DATE_INDEX, REG_NO_INDEX
+from conftest import read_rows
+from merge import merge_checkpoints
+from standin_server import synthetic_rows
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(GREENBOOK_COLUMNS)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    """Base rows 0-9 and a newer file with rows 5-14: row 5 re-approved later, row 7 with an
+    older approval date, rows 6, 8 and 9 unchanged, rows 10-14 new."""
+    rows = synthetic_rows(15)
+    newer = [list(r) for r in rows[5:]]
+    newer[0][APPROVAL_DATE_INDEX] = "2030-01-01"
+    newer[0][-1] = "Inactive"
+    newer[2][APPROVAL_DATE_INDEX] = "1990-01-01"
+    return write_csv(tmp_path / "base.csv", rows[:10]), write_csv(tmp_path / "newer.csv", newer), rows, newer
+
+
+@pytest.mark.parametrize("policy, replaced", [("newest", 1), ("last", 2), ("priority", 0)])
+def test_merge_report_counts(tmp_path, inputs, policy, replaced):
+    base, newer, _, _ = inputs
+
+    # A small chunk size forces several sorted runs per input
+    stats = merge_checkpoints([base, newer], str(tmp_path / "merged.csv"), policy=policy, chunk_size=4)
+
+    assert stats == {'written': 15, 'added': 5, 'replaced': replaced, 'dropped': 5}
+
+
+def test_merge_output_sorted_and_newest_row_kept(tmp_path, inputs):
+    base, newer, rows, newer_rows = inputs
+    out = tmp_path / "merged.csv"
+
+    merge_checkpoints([base, newer], str(out), policy="newest", chunk_size=4)
+
+    merged = read_rows(out)
+    assert [r[REG_NO_INDEX] for r in merged] == sorted(r[REG_NO_INDEX] for r in rows)
+    assert newer_rows[0] in merged
+    assert rows[7] in merged
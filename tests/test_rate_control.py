@@ -0,0 +1,50 @@
+import time
+
+from rate_control import RateController
+
+
+def fill(ctl, latency, count, status=200):
+    for _ in range(count):
+        start = ctl.acquire()
+        ctl.release(start - latency, status=status)
+
+
+def test_slow_start_grows_rate_until_the_ceiling():
+    ctl = RateController(rate=1000, max_rate=1100, max_concurrency=4)
+    # About one request/s more per success at this rate
+    fill(ctl, 0.001, 150)
+
+    assert ctl.rate == 1100
+    assert ctl.concurrency <= ctl.max_concurrency == 4
+
+
+def test_throttling_halves_rate_once_per_cool_down():
+    ctl = RateController(rate=1000, max_rate=1000, max_concurrency=8)
+    fill(ctl, 0.001, 20)
+
+    for _ in range(3):
+        start = ctl.acquire()
+        ctl.release(start, status=429)
+
+    assert ctl.rate == 500
+    assert ctl.congestion_events == 1
+    assert not ctl.slow_start
+
+
+def test_retry_after_blocks_acquire():
+    ctl = RateController(rate=1000, max_rate=1000)
+    start = ctl.acquire()
+    ctl.release(start, status=429, retry_after=0.2)
+
+    t0 = time.monotonic()
+    ctl.acquire()
+    assert time.monotonic() - t0 >= 0.15
+
+
+def test_in_flight_never_exceeds_concurrency():
+    ctl = RateController(rate=1000, max_rate=1000, max_concurrency=1)
+    ctl.acquire()
+
+    assert ctl.in_flight == ctl.concurrency == 1
+    ctl.release(time.monotonic(), status=200)
+    assert ctl.in_flight == 0
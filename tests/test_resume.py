@@ -0,0 +1,40 @@
+import run
+from conftest import ROWS, read_rows, scrape
+
+
+def test_resume_offset_search_finds_row_after_last_identifier(standin):
+    state, base_url = standin
+    ordered = state.sorted_rows(run.REG_NO_INDEX, 'asc')
+    target = ordered[1234][run.REG_NO_INDEX]
+
+    offset, exact = run.find_resume_offset_via_api(target, base_url + "api", run.make_http_session())
+
+    assert (offset, exact) == (1235, True)
+
+
+def test_resume_offset_search_uses_sort_position_of_deleted_row(standin):
+    state, base_url = standin
+    deleted = state.sorted_rows(run.REG_NO_INDEX, 'asc')[1234]
+    state.rows = [r for r in state.rows if r is not deleted]
+    state._sorted = {}
+
+    offset, exact = run.find_resume_offset_via_api(deleted[run.REG_NO_INDEX], base_url + "api", run.make_http_session())
+
+    assert (offset, exact) == (1234, False)
+
+
+def test_resume_continues_after_rows_inserted_before_checkpoint_end(standin, workdir):
+    state, base_url = standin
+    output = workdir / "greenbook.xlsx"
+    assert scrape(base_url, output, end_page=100) == 1000
+
+    # A record that sorts inside the checkpointed range shifts every later offset by one
+    state.rows = state.rows + [["Late Tablet", "Ibuprofen", "Drugs", "A4-000000a", "Tablet", "Oral",
+                                "5 mg", "Applicant 1 Pharmaceutical Ltd", "2024-01-01", "Active"]]
+    state._sorted = {}
+    scrape(base_url, output, end_page=ROWS // run.DISPLAY_PAGE_LENGTH + 1)
+
+    keys = [r[run.REG_NO_INDEX] for r in read_rows(workdir / "greenbook.csv")]
+    # Every original record exactly once; the late one sorts before the resume point
+    assert len(keys) == len(set(keys)) == ROWS
+    assert "A4-000000a" not in keys
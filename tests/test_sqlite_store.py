@@ -0,0 +1,55 @@
+import os
+
+from sqlite_store import SQLiteStore, read_summary
+from standin_server import synthetic_rows
+
+
+def test_write_page_upserts_on_reg_no(tmp_path):
+    store = SQLiteStore(str(tmp_path / "gb.sqlite3"))
+    rows = synthetic_rows(20)
+    try:
+        assert store.write_page(rows[:10], page=1, offset=0, order='3:asc') == (10, 0)
+        changed = list(rows[5])
+        changed[-1] = "Withdrawn"
+        # Overlapping page: five known rows (one changed), five new
+        assert store.write_page([changed] + rows[6:15], page=2, offset=5) == (5, 5)
+        assert store.summary()['rows'] == 15
+        assert store.row_state(changed) == 'known'
+        assert store.row_state(rows[5]) == 'changed'
+        assert store.row_state(rows[15]) == 'new'
+    finally:
+        store.close()
+
+
+def test_delta_rows_keep_provenance_and_export_last(tmp_path):
+    store = SQLiteStore(str(tmp_path / "gb.sqlite3"))
+    rows = synthetic_rows(12)
+    try:
+        store.write_page(rows[:10], page=1, offset=0)
+        changed = list(rows[0])
+        changed[-1] = "Withdrawn"
+        store.write_delta([rows[11], changed])
+        # Gap rows go back to their source offsets ahead of the delta row
+        store.insert_gap_rows([{'rows': [rows[10]], 'page': 2, 'offset': 10}])
+
+        assert store.summary()['next_offset'] == 10
+        assert list(store.iter_rows(by_offset=True)) == [changed] + rows[1:11] + [rows[11]]
+    finally:
+        store.close()
+
+
+def test_read_summary_never_creates_or_changes_the_database(tmp_path):
+    path = str(tmp_path / "gb.sqlite3")
+    assert read_summary(path) is None
+    assert not os.path.exists(path)
+
+    store = SQLiteStore(path)
+    store.write_page(synthetic_rows(3), page=1, offset=0, endpoint="http://x/api")
+    store.close()
+    before = open(path, 'rb').read()
+
+    summary = read_summary(path)
+
+    assert (summary['rows'], summary['next_offset'], summary['endpoint']) == (3, 3, "http://x/api")
+    assert open(path, 'rb').read() == before
+    assert sorted(os.listdir(tmp_path)) == ["gb.sqlite3"]